@@ -1,16 +1,15 @@
 import streamlit as st
 import folium
 from streamlit_folium import folium_static
-from openai import OpenAI
-import google.generativeai as genai
-import json
-import re
 import logging
 import random
 import base64
 from PIL import Image
 import urllib.parse
 from folium.plugins import MarkerCluster
+from recommendation_api import RecommendationClient, locations, menus
+from recommendation_cache import RecommendationCache
+from recommendation_prefetch import RecommendationPrefetcher
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -19,27 +18,21 @@ logging.basicConfig(level=logging.INFO)
 OPENAI_API_KEY = st.secrets["OPENAI"]["api_key"]
 GOOGLE_API_KEY = st.secrets["GOOGLE"]["api_key"]
 
-# OpenAI 및 Google Gemini 클라이언트 설정
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-genai.configure(api_key=GOOGLE_API_KEY)
-gemini_model = genai.GenerativeModel('gemini-pro')
+# OpenAI 및 Google Gemini 클라이언트 설정 (추천 결과는 SQLite 캐시에 저장되어 세션/프로세스 간 공유).
+# 재실행마다 새로 만들면 SDK 클라이언트(HTTP 연결)가 닫히지 않고 쌓이므로 프로세스에서 한 번만 만듦
+@st.cache_resource(show_spinner=False)
+def get_recommendation_client(openai_api_key, google_api_key):
+    return RecommendationClient(openai_api_key, google_api_key, RecommendationCache('recommendations.db'))
 
 # 페이지 설정
 st.set_page_config(page_title="도쿄 맛집 추천 서비스", layout="wide")
 
-# 위치와 메뉴 데이터 정의
-locations = {
-    "신주쿠": "shinjuku", "시부야": "shibuya", "긴자": "ginza",
-    "롯폰기": "roppongi", "우에노": "ueno", "아사쿠사": "asakusa",
-    "아키하바라": "akihabara"
-}
+recommendation_client = get_recommendation_client(OPENAI_API_KEY, GOOGLE_API_KEY)
 
-menus = {
-    "스시": "sushi", "라멘": "ramen", "야키토리": "yakitori",
-    "텐푸라": "tempura", "우동": "udon", "소바": "soba",
-    "돈카츠": "tonkatsu"
-}
+# 자동 모드: OpenAI를 먼저 호출하고 늦거나 실패하면 Gemini도 호출해 먼저 온 유효한 답을 사용
+AUTO_CHOICE = "자동 (빠른 응답)"
 
+# 위치 좌표 (위치와 메뉴 목록은 recommendation_api에 정의)
 latitudes = {
     "신주쿠": 35.6938, "시부야": 35.6580, "긴자": 35.6721,
     "롯폰기": 35.6628, "우에노": 35.7089, "아사쿠사": 35.7147,
@@ -58,78 +51,12 @@ def add_bg_from_local(image_file):
         encoded_string = base64.b64encode(image_file.read())
     return f"data:image/png;base64,{encoded_string.decode()}"
 
-def extract_json(text):
-    match = re.search(r'\[.*\]', text, re.DOTALL)
-    return match.group() if match else None
-
-# API 호출 함수
+# API 호출 함수 (호출과 캐시는 recommendation_api, 같은 조합은 TTL 동안 캐시된 응답을 사용)
 def call_openai_api(location, menu):
-    prompt = f"""tabelog.com 사이트를 기반으로 도쿄의 {location} 지역에 위치한 현재 영업 중인 {menu} 맛집을 추천해주세요. 
-    별점 5점에 가까운 랭킹 1위~5위 맛집을 선정하고, 각 맛집에 대해 다음 정보를 포함해 주세요:
-    - 가게 이름
-    - 별점 (5점 만점)
-    - 리뷰 수
-    - 가게 리뷰 요약
-    - 상세 정보 (특징, 추천 메뉴 등)
-    - 가게 정보 (주소, 전화번호, 영업시간, 가격대)
-    - 가게 웹사이트 URL (없는 경우 "https://tabelog.com/tokyo/"로 설정)
-    반드시 다음과 같은 유효한 JSON 형식으로 응답해주세요:
-    [
-      {{
-        "name": "레스토랑 이름",
-        "rating": 4.5,
-        "reviews": 100,
-        "review_summary": "리뷰 요약",
-        "details": "상세 정보",
-        "address": "주소",
-        "phone": "전화번호",
-        "hours": "영업시간",
-        "price_range": "가격대",
-        "website": "https://restaurant-website.com"
-      }},
-      ...
-    ]
-    """
-    response = openai_client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "당신은 도쿄 레스토랑 추천 전문가입니다."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    json_str = extract_json(response.choices[0].message.content)
-    return json.loads(json_str) if json_str else None
+    return recommendation_client.recommend('openai', location, menu)
 
 def call_gemini_api(location, menu):
-    prompt = f"""tabelog.com 사이트를 기반으로 도쿄의 {location} 지역에 위치한 현재 영업 중인 {menu} 맛집을 추천해주세요. 
-    별점 5점에 가까운 랭킹 1위~5위 맛집을 선정하고, 각 맛집에 대해 다음 정보를 포함해 주세요:
-    - 가게 이름
-    - 별점 (5점 만점)
-    - 리뷰 수
-    - 가게 리뷰 요약
-    - 상세 정보 (특징, 추천 메뉴 등)
-    - 가게 정보 (주소, 전화번호, 영업시간, 가격대)
-    - 가게 웹사이트 URL (없는 경우 "https://tabelog.com/tokyo/"로 설정)
-    반드시 다음과 같은 유효한 JSON 형식으로 응답해주세요:
-    [
-      {{
-        "name": "레스토랑 이름",
-        "rating": 4.5,
-        "reviews": 100,
-        "review_summary": "리뷰 요약",
-        "details": "상세 정보",
-        "address": "주소",
-        "phone": "전화번호",
-        "hours": "영업시간",
-        "price_range": "가격대",
-        "website": "https://restaurant-website.com"
-      }},
-      ...
-    ]
-    """
-    response = gemini_model.generate_content(prompt)
-    json_str = extract_json(response.text)
-    return json.loads(json_str) if json_str else None
+    return recommendation_client.recommend('gemini', location, menu)
 
 def get_share_urls(restaurant_name, location, menu):
     base_url = "https://your-streamlit-app-url.com"  # 실제 앱 URL로 변경해야 함
@@ -177,6 +104,31 @@ def create_popup_content(restaurant, location, menu):
     </div>
     """
 
+# LLM 추천 결과에는 좌표가 없으므로 지역 중심 주변에 흩어 표시 (실제 위치가 아님)
+def add_restaurant_marker(marker_cluster, restaurant, lat, lon, location, menu):
+    restaurant_lat = lat + random.uniform(-0.005, 0.005)
+    restaurant_lon = lon + random.uniform(-0.005, 0.005)
+    
+    popup_content = create_popup_content(restaurant, location, menu)
+    iframe = folium.IFrame(html=popup_content, width=350, height=450)
+    popup = folium.Popup(iframe, max_width=350)
+
+    tooltip_content = f"""
+    <div style="font-size: 14px;">
+    <b>{restaurant.get('name', 'Unknown')}</b><br>
+    평점: {restaurant.get('rating', 'N/A')}<br>
+    리뷰 수: {restaurant.get('reviews', 'N/A')}<br>
+    가격대: {restaurant.get('price_range', 'N/A')}<br>
+    </div>
+    """
+
+    folium.Marker(
+        [restaurant_lat, restaurant_lon],
+        popup=popup,
+        tooltip=folium.Tooltip(tooltip_content),
+        icon=folium.Icon(color='green', icon='cutlery', prefix='fa')
+    ).add_to(marker_cluster)
+
 # 메인 앱 로직
 def main():
     # 사이드바 배경 이미지 설정
@@ -219,7 +171,8 @@ def main():
     st.sidebar.header("검색 옵션")
     location = st.sidebar.selectbox("도쿄 내 관광지 선택", list(locations.keys()), key="location_select")
     menu = st.sidebar.selectbox("도쿄 대표 메뉴 선택", list(menus.keys()), key="menu_select")
-    api_choice = st.sidebar.radio("AI 모델 선택", ["OpenAI GPT", "Google Gemini"], key="api_choice_radio")
+    api_choice = st.sidebar.radio("AI 모델 선택", ["OpenAI GPT", "Google Gemini", AUTO_CHOICE], key="api_choice_radio")
+    stream_mode = st.sidebar.checkbox("받는 대로 표시 (스트리밍)", value=True, key="stream_mode_checkbox")
 
     # 검색 버튼
     if st.sidebar.button("맛집 검색", key="search_button"):
@@ -228,42 +181,53 @@ def main():
         marker_cluster = MarkerCluster().add_to(m)
 
         try:
-            with st.spinner('로컬 맛집 정보와 지도를 가져오는 중 입니다...'):
-                recommendations = call_openai_api(location, menu) if api_choice == "OpenAI GPT" else call_gemini_api(location, menu)
-            
-            if recommendations:
-                for restaurant in recommendations:
-                    restaurant_lat = lat + random.uniform(-0.005, 0.005)
-                    restaurant_lon = lon + random.uniform(-0.005, 0.005)
-                    
-                    popup_content = create_popup_content(restaurant, location, menu)
-                    iframe = folium.IFrame(html=popup_content, width=350, height=450)
-                    popup = folium.Popup(iframe, max_width=350)
-
-                    tooltip_content = f"""
-                    <div style="font-size: 14px;">
-                    <b>{restaurant.get('name', 'Unknown')}</b><br>
-                    평점: {restaurant.get('rating', 'N/A')}<br>
-                    리뷰 수: {restaurant.get('reviews', 'N/A')}<br>
-                    가격대: {restaurant.get('price_range', 'N/A')}<br>
-                    </div>
-                    """
-
-                    folium.Marker(
-                        [restaurant_lat, restaurant_lon],
-                        popup=popup,
-                        tooltip=folium.Tooltip(tooltip_content),
-                        icon=folium.Icon(color='green', icon='cutlery', prefix='fa')
-                    ).add_to(marker_cluster)
-
-                st.subheader(f"{location}의 {menu} 맛집 지도")
-                folium_static(m, width=800, height=500)
-
+            if stream_mode and api_choice != AUTO_CHOICE:
+                # 가게 정보가 하나 완성될 때마다 마커를 추가하고 지도를 다시 그림
+                provider = 'openai' if api_choice == "OpenAI GPT" else 'gemini'
+                map_placeholder = st.empty()
+                count = 0
+                with st.spinner('로컬 맛집 정보와 지도를 가져오는 중 입니다...'):
+                    for restaurant in recommendation_client.stream(provider, location, menu):
+                        add_restaurant_marker(marker_cluster, restaurant, lat, lon, location, menu)
+                        count += 1
+                        with map_placeholder.container():
+                            st.subheader(f"{location}의 {menu} 맛집 지도")
+                            folium_static(m, width=800, height=500)
+                if not count:
+                    st.error("맛집 정보를 가져오는 데 실패했습니다. 다시 시도해 주세요.")
             else:
-                st.error("맛집 정보를 가져오는 데 실패했습니다. 다시 시도해 주세요.")
+                with st.spinner('로컬 맛집 정보와 지도를 가져오는 중 입니다...'):
+                    if api_choice == AUTO_CHOICE:
+                        # 두 모델 중 먼저 온 유효한 답을 사용
+                        _, recommendations = recommendation_client.recommend_hedged(location, menu)
+                    else:
+                        recommendations = call_openai_api(location, menu) if api_choice == "OpenAI GPT" else call_gemini_api(location, menu)
+
+                if recommendations:
+                    for restaurant in recommendations:
+                        add_restaurant_marker(marker_cluster, restaurant, lat, lon, location, menu)
+
+                    st.subheader(f"{location}의 {menu} 맛집 지도")
+                    folium_static(m, width=800, height=500)
+
+                else:
+                    st.error("맛집 정보를 가져오는 데 실패했습니다. 다시 시도해 주세요.")
         except Exception as e:
             st.error(f"오류 발생: {str(e)}")
 
+    # 관리자 모드: 모든 지역 × 메뉴 조합의 추천을 미리 받아 캐시를 채우고, 호출 통계를 표시
+    if st.sidebar.checkbox("관리자 모드", key="admin_mode_checkbox"):
+        if st.sidebar.button("추천 캐시 미리 채우기", key="prefetch_button"):
+            with st.spinner('모든 지역과 메뉴의 추천 결과를 가져오는 중 입니다...'):
+                summary = RecommendationPrefetcher(recommendation_client).run()
+            st.sidebar.success(f"새로 채움: {summary['fetched']}, 이미 캐시됨: {summary['skipped']}")
+            if summary['failed']:
+                st.sidebar.warning(f"실패한 조합: {len(summary['failed'])}개")
+        # 동시에 들어온 같은 요청을 한 번의 API 호출로 합친 횟수
+        flight_stats = recommendation_client.single_flight.stats()
+        st.sidebar.caption(f"API 호출: {flight_stats['executed']}, 합쳐진 요청: {flight_stats['coalesced']}, "
+                           f"대기 시간 초과: {flight_stats['timed_out']}, 진행 중: {flight_stats['in_flight']}")
+
 if __name__ == "__main__":
     main()
 
@@ -9,7 +9,8 @@ import logging
 import random
 import base64
 from PIL import Image
-import matplotlib.pyplot as plt
+from restaurant_database import RestaurantDatabase
+from restaurant_visualizer import RestaurantVisualizer
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +26,9 @@ openai_client = OpenAI(api_key=OPENAI_API_KEY)
 genai.configure(api_key=GOOGLE_API_KEY)
 gemini_model = genai.GenerativeModel('gemini-pro')
 
+# 스크래핑 데이터가 저장된 데이터베이스
+DB_NAME = 'restaurants.db'
+
 # 페이지 설정
 st.set_page_config(page_title="도쿄 맛집 추천 서비스", layout="wide")
 
@@ -43,17 +47,15 @@ def generate_mock_data(location, menu):
     return []
 
 def get_restaurants_from_db(location, menu):
-    st.info("데이터베이스에서 실제 레스토랑 정보를 가져오고 있습니다...")
-    st.warning("현재 데모 버전으로, 실제 데이터베이스 연동은 되어 있지 않습니다. 추후 업데이트 예정입니다.")
-    
-    # 실제 데이터베이스 쿼리 대신 임시로 빈 리스트 반환
-    return []
+    db = RestaurantDatabase(DB_NAME)
+    try:
+        return db.get_restaurants(location=location, menu=menu, limit=10)
+    finally:
+        db.close()
 
+# 데이터가 바뀌지 않았으면 캐시된 PNG를 그대로 사용
 def visualize_restaurant_data():
-    fig, ax = plt.subplots()
-    ax.bar(['A', 'B', 'C', 'D'], [random.randint(1, 10) for _ in range(4)])
-    ax.set_title("레스토랑 데이터 시각화 (더미)")
-    return fig
+    return RestaurantVisualizer(DB_NAME).render('png')
 
 # 배경 이미지 함수
 def add_bg_from_local(image_file):
@@ -203,8 +205,7 @@ if st.sidebar.button("맛집 검색", key="search_button"):
 
     # 데이터 시각화
     st.subheader("레스토랑 데이터 시각화")
-    fig = visualize_restaurant_data()
-    st.pyplot(fig)
+    st.image(visualize_restaurant_data())
 
 # 데이터 업데이트 기능 (관리자용)
 if st.sidebar.checkbox("관리자 모드", key="admin_mode_checkbox"):
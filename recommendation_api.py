@@ -0,0 +1,381 @@
+# recommendation_api.py
+import asyncio
+import json
+import re
+import threading
+from recommendation_cache import RecommendationCache, cache_key, prompt_hash
+from single_flight import SingleFlight
+
+# 위치와 메뉴 데이터 정의 (화면 선택지이자 미리 채울 캐시 조합)
+locations = {
+    "신주쿠": "shinjuku", "시부야": "shibuya", "긴자": "ginza",
+    "롯폰기": "roppongi", "우에노": "ueno", "아사쿠사": "asakusa",
+    "아키하바라": "akihabara"
+}
+
+menus = {
+    "스시": "sushi", "라멘": "ramen", "야키토리": "yakitori",
+    "텐푸라": "tempura", "우동": "udon", "소바": "soba",
+    "돈카츠": "tonkatsu"
+}
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+GEMINI_MODEL = "gemini-pro"
+PROVIDER_MODELS = {'openai': OPENAI_MODEL, 'gemini': GEMINI_MODEL}
+SYSTEM_PROMPT = "당신은 도쿄 레스토랑 추천 전문가입니다."
+
+# 자동 모드: 첫 모델이 이 시간(초) 안에 유효한 답을 주지 않으면 다음 모델도 호출 (0이면 동시에 호출)
+HEDGE_DELAY = 3.0
+
+# 두 모델이 같은 프롬프트를 사용. 문구를 바꾸면 캐시 키(프롬프트 해시)도 바뀜
+PROMPT_TEMPLATE = """tabelog.com 사이트를 기반으로 도쿄의 {location} 지역에 위치한 현재 영업 중인 {menu} 맛집을 추천해주세요. 
+    별점 5점에 가까운 랭킹 1위~5위 맛집을 선정하고, 각 맛집에 대해 다음 정보를 포함해 주세요:
+    - 가게 이름
+    - 별점 (5점 만점)
+    - 리뷰 수
+    - 가게 리뷰 요약
+    - 상세 정보 (특징, 추천 메뉴 등)
+    - 가게 정보 (주소, 전화번호, 영업시간, 가격대)
+    - 가게 웹사이트 URL (없는 경우 "https://tabelog.com/tokyo/"로 설정)
+    반드시 다음과 같은 유효한 JSON 형식으로 응답해주세요:
+    [
+      {{
+        "name": "레스토랑 이름",
+        "rating": 4.5,
+        "reviews": 100,
+        "review_summary": "리뷰 요약",
+        "details": "상세 정보",
+        "address": "주소",
+        "phone": "전화번호",
+        "hours": "영업시간",
+        "price_range": "가격대",
+        "website": "https://restaurant-website.com"
+      }},
+      ...
+    ]
+    """
+
+def build_prompt(location, menu):
+    return PROMPT_TEMPLATE.format(location=location, menu=menu)
+
+def extract_json(text):
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    return match.group() if match else None
+
+def parse_recommendations(text):
+    json_str = extract_json(text)
+    return json.loads(json_str) if json_str else None
+
+# 화면에 표시할 수 있는 가게 정보: 이름이 있고 평점이 0~5 사이 숫자
+def is_valid_restaurant(restaurant):
+    if not isinstance(restaurant, dict):
+        return False
+    name = restaurant.get('name')
+    if not isinstance(name, str) or not name.strip():
+        return False
+    try:
+        rating = float(restaurant.get('rating'))
+    except (TypeError, ValueError):
+        return False
+    return 0 <= rating <= 5
+
+# 유효한 가게만 남긴 목록, 하나도 없으면 None
+def validate_recommendations(value):
+    if not isinstance(value, list):
+        return None
+    restaurants = [restaurant for restaurant in value if is_valid_restaurant(restaurant)]
+    return restaurants or None
+
+# 여러 세션이 같은 추천을 동시에 요청하면 API 호출은 한 번만 하고 결과를 나눠 씀 (프로세스 전체에서 공유)
+single_flight = SingleFlight()
+
+# 비동기 SDK 클라이언트는 만들어진 이벤트 루프에 묶이므로 프로세스 전체에서 루프 하나를 백그라운드 스레드로 돌려 공유
+_loop = None
+_loop_lock = threading.Lock()
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='recommendation-loop', daemon=True).start()
+        return _loop
+
+# 텍스트 조각을 받는 대로 읽어, 응답의 첫 JSON 배열 안 객체가 닫힐 때마다 하나씩 반환.
+# 배열 앞의 설명문이나 ```json 같은 코드 블록 표시는 건너뛰고, 해석할 수 없는 객체는 버림.
+# 설명문의 '[참고]'나 마크다운 링크와 구분하기 위해 다음 공백 아닌 문자가 '{' 또는 ']'인 '['만 배열의 시작으로 봄
+def iter_json_objects(chunks):
+    depth = 0
+    in_string = False
+    escaped = False
+    opened = False
+    started = False
+    buffer = []
+    for chunk in chunks:
+        for char in chunk:
+            if not started:
+                if char == '[':
+                    opened = True
+                    continue
+                if not opened or char.isspace():
+                    continue
+                if char == ']':
+                    return  # 빈 배열
+                opened = False
+                if char != '{':
+                    continue
+                started = True
+            if depth > 0:
+                buffer.append(char)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in '{[':
+                if depth == 0:
+                    buffer = [char]
+                depth += 1
+            elif char in '}]':
+                if depth == 0:
+                    return  # 배열의 끝
+                depth -= 1
+                if depth == 0:
+                    try:
+                        value = json.loads(''.join(buffer))
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(value, dict):
+                        yield value
+
+class RecommendationClient:
+    # Streamlit 없이도 쓸 수 있는 추천 API 클라이언트. SDK 클라이언트는 처음 쓸 때 만듦
+    def __init__(self, openai_api_key=None, google_api_key=None, cache=None):
+        self.openai_api_key = openai_api_key
+        self.google_api_key = google_api_key
+        self.cache = cache or RecommendationCache()
+        self.lock = threading.Lock()
+        self.single_flight = single_flight
+        self.openai_client = None
+        self.openai_async_client = None
+        self.gemini_model = None
+
+    def _openai(self):
+        with self.lock:
+            if self.openai_client is None:
+                if not self.openai_api_key:
+                    raise ValueError("OpenAI API 키가 설정되지 않았습니다.")
+                from openai import OpenAI
+                self.openai_client = OpenAI(api_key=self.openai_api_key)
+            return self.openai_client
+
+    def _openai_async(self):
+        with self.lock:
+            if self.openai_async_client is None:
+                if not self.openai_api_key:
+                    raise ValueError("OpenAI API 키가 설정되지 않았습니다.")
+                from openai import AsyncOpenAI
+                self.openai_async_client = AsyncOpenAI(api_key=self.openai_api_key)
+            return self.openai_async_client
+
+    def _gemini(self):
+        with self.lock:
+            if self.gemini_model is None:
+                if not self.google_api_key:
+                    raise ValueError("Google API 키가 설정되지 않았습니다.")
+                import google.generativeai as genai
+                genai.configure(api_key=self.google_api_key)
+                self.gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+            return self.gemini_model
+
+    # 캐시를 거치지 않는 실제 API 호출
+    def fetch(self, provider, location, menu):
+        prompt = build_prompt(location, menu)
+        if provider == 'openai':
+            response = self._openai().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            return parse_recommendations(response.choices[0].message.content)
+        if provider == 'gemini':
+            response = self._gemini().generate_content(prompt)
+            return parse_recommendations(response.text)
+        raise ValueError(f"지원하지 않는 추천 모델입니다: {provider}")
+
+    def _flight_key(self, provider, location, menu):
+        if provider not in PROVIDER_MODELS:
+            raise ValueError(f"지원하지 않는 추천 모델입니다: {provider}")
+        return cache_key(provider, PROVIDER_MODELS[provider], location, menu, prompt_hash(PROMPT_TEMPLATE))
+
+    # 캐시와 상관없이 새로 호출해 캐시를 갱신 (미리 채우기용). 같은 조합의 진행 중인 호출이 있으면 그 결과를 사용
+    def refresh(self, provider, location, menu):
+        def fetch_and_store():
+            response = self.fetch(provider, location, menu)
+            if response:
+                self.cache.set(provider, PROVIDER_MODELS[provider], location, menu,
+                               prompt_hash(PROMPT_TEMPLATE), response)
+            return response
+
+        return self.single_flight.do(self._flight_key(provider, location, menu), fetch_and_store)
+
+    # 스트리밍으로 받은 가게를 그대로 넘기고, 끝까지 받으면 캐시에 저장한 뒤 전체 목록을 반환
+    def _stream_and_store(self, provider, location, menu):
+        restaurants = []
+        for restaurant in iter_json_objects(self._stream_text(provider, location, menu)):
+            restaurants.append(restaurant)
+            yield restaurant
+        if restaurants:
+            self.cache.set(provider, PROVIDER_MODELS[provider], location, menu, prompt_hash(PROMPT_TEMPLATE), restaurants)
+        return restaurants
+
+    # 스트리밍 API로 받은 텍스트 조각
+    def _stream_text(self, provider, location, menu):
+        prompt = build_prompt(location, menu)
+        if provider == 'openai':
+            stream = self._openai().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        elif provider == 'gemini':
+            for chunk in self._gemini().generate_content(prompt, stream=True):
+                yield chunk.text
+        else:
+            raise ValueError(f"지원하지 않는 추천 모델입니다: {provider}")
+
+    # 가게 정보를 완성되는 대로 하나씩 반환. 캐시에 있으면 바로 반환하고,
+    # 없으면 스트리밍으로 받은 뒤 응답이 끝까지 왔을 때 전체를 캐시에 저장.
+    # 같은 조합을 이미 다른 세션이 받는 중이면 새로 호출하지 않고 그 결과가 끝나기를 기다려 반환
+    def stream(self, provider, location, menu):
+        key = self._flight_key(provider, location, menu)
+        model = PROVIDER_MODELS[provider]
+        template_hash = prompt_hash(PROMPT_TEMPLATE)
+        cached = self.cache.get(provider, model, location, menu, template_hash)
+        if cached is not None:
+            yield from cached
+            return
+        while True:
+            call, leader = self.single_flight.join(key)
+            if leader:
+                break
+            if not self.single_flight.wait(call):
+                yield from self._stream_and_store(provider, location, menu)
+                return
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            yield from call.result or []
+            return
+        try:
+            restaurants = yield from self._stream_and_store(provider, location, menu)
+        except Exception as e:
+            self.single_flight.complete(key, call, error=e)
+            raise
+        except BaseException:
+            # 화면 재실행 등으로 소비가 중단되면 기다리던 세션이 직접 다시 호출
+            self.single_flight.complete(key, call, abandoned=True)
+            raise
+        self.single_flight.complete(key, call, result=restaurants or None)
+
+    # 비동기 API 호출 결과를 검증해 유효한 가게 목록 또는 None을 반환. 취소하면 진행 중인 요청도 끊김
+    async def fetch_async(self, provider, location, menu):
+        prompt = build_prompt(location, menu)
+        if provider == 'openai':
+            response = await self._openai_async().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            text = response.choices[0].message.content
+        elif provider == 'gemini':
+            response = await self._gemini().generate_content_async(prompt)
+            text = response.text
+        else:
+            raise ValueError(f"지원하지 않는 추천 모델입니다: {provider}")
+        return validate_recommendations(parse_recommendations(text))
+
+    # 첫 모델을 호출하고, hedge_delay 안에 유효한 답이 없거나 먼저 실패하면 다음 모델을 호출.
+    # 먼저 도착한 유효한 답을 쓰고 나머지 요청은 취소
+    async def _race(self, providers, location, menu, hedge_delay):
+        waiting = list(providers)
+        tasks = {}
+
+        def launch():
+            provider = waiting.pop(0)
+            tasks[asyncio.ensure_future(self.fetch_async(provider, location, menu))] = provider
+
+        launch()
+        try:
+            while tasks:
+                timeout = hedge_delay if waiting else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    provider = tasks.pop(task)
+                    try:
+                        restaurants = task.result()
+                    except Exception:
+                        restaurants = None
+                    if restaurants:
+                        return provider, restaurants
+                if waiting and len(tasks) == 0:
+                    launch()
+            return None, None
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    # 자동 모드: 캐시에 있는 모델의 답을 먼저 쓰고, 없으면 모델들을 지연 호출로 경쟁시켜 먼저 온 유효한 답을 사용.
+    # (답한 모델, 가게 목록)을 반환하며 모두 실패하면 (None, None)
+    def recommend_hedged(self, location, menu, providers=('openai', 'gemini'), hedge_delay=HEDGE_DELAY):
+        for provider in providers:
+            if provider not in PROVIDER_MODELS:
+                raise ValueError(f"지원하지 않는 추천 모델입니다: {provider}")
+        template_hash = prompt_hash(PROMPT_TEMPLATE)
+        for provider in providers:
+            cached = self.cache.get(provider, PROVIDER_MODELS[provider], location, menu, template_hash)
+            if cached is not None:
+                return provider, cached
+
+        def race():
+            future = asyncio.run_coroutine_threadsafe(
+                self._race(providers, location, menu, hedge_delay), _background_loop()
+            )
+            provider, restaurants = future.result()
+            if restaurants:
+                self.cache.set(provider, PROVIDER_MODELS[provider], location, menu, template_hash, restaurants)
+            return provider, restaurants
+
+        key = json.dumps(['auto', location, menu, template_hash, list(providers), hedge_delay], ensure_ascii=False)
+        return self.single_flight.do(key, race)
+
+    # 같은 (모델, 지역, 메뉴, 프롬프트) 조합은 TTL 동안 캐시된 응답을 사용하고,
+    # 캐시에 없는 조합을 여러 세션이 동시에 요청하면 API 호출 하나의 결과를 함께 사용.
+    # 캐시는 single-flight 밖에서 먼저 확인하므로 single_flight의 executed는 실제 API 호출 수
+    def recommend(self, provider, location, menu):
+        if provider not in PROVIDER_MODELS:
+            raise ValueError(f"지원하지 않는 추천 모델입니다: {provider}")
+        cached = self.cache.get(provider, PROVIDER_MODELS[provider], location, menu, prompt_hash(PROMPT_TEMPLATE))
+        if cached is not None:
+            return cached
+        return self.refresh(provider, location, menu)
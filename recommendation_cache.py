@@ -0,0 +1,64 @@
+# recommendation_cache.py
+import hashlib
+import json
+import time
+from restaurant_db_pool import get_pool
+
+# 추천 결과는 하루 동안 재사용
+DEFAULT_TTL = 24 * 60 * 60
+
+CACHE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS recommendation_cache (
+    cache_key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    location TEXT NOT NULL,
+    menu TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+'''
+
+# 프롬프트 문구를 바꾸면 해시가 달라져 이전 응답을 쓰지 않음
+def prompt_hash(template):
+    return hashlib.sha1(template.encode('utf-8')).hexdigest()
+
+def cache_key(provider, model, location, menu, template_hash):
+    return json.dumps([provider, model, location, menu, template_hash], ensure_ascii=False)
+
+class RecommendationCache:
+    # LLM 추천 응답을 SQLite에 TTL과 함께 저장. 연결 풀을 공유하므로 세션 간에, 파일이므로 프로세스 간에도 공유됨
+    def __init__(self, db_name='recommendations.db', ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.pool = get_pool(db_name)
+        with self.pool.writer() as conn:
+            conn.execute(CACHE_SCHEMA)
+
+    def get(self, provider, model, location, menu, template_hash):
+        key = cache_key(provider, model, location, menu, template_hash)
+        with self.pool.reader() as conn:
+            row = conn.execute(
+                'SELECT response FROM recommendation_cache WHERE cache_key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, provider, model, location, menu, template_hash, response, ttl=None):
+        key = cache_key(provider, model, location, menu, template_hash)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self.pool.writer() as conn:
+            conn.execute('''
+            INSERT OR REPLACE INTO recommendation_cache
+            (cache_key, provider, model, location, menu, prompt_hash, response, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, provider, model, location, menu, template_hash,
+                  json.dumps(response, ensure_ascii=False), expires_at))
+
+    def purge_expired(self):
+        with self.pool.writer() as conn:
+            return conn.execute('DELETE FROM recommendation_cache WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def clear(self):
+        with self.pool.writer() as conn:
+            conn.execute('DELETE FROM recommendation_cache')
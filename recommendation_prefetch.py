@@ -0,0 +1,93 @@
+# recommendation_prefetch.py
+import argparse
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from recommendation_api import PROMPT_TEMPLATE, PROVIDER_MODELS, RecommendationClient, locations, menus
+from recommendation_cache import RecommendationCache, prompt_hash
+
+logger = logging.getLogger(__name__)
+
+class RecommendationPrefetcher:
+    # 지역 × 메뉴 × 모델 조합을 미리 호출해 추천 캐시를 채움.
+    # 동시에 진행 중인 API 호출은 max_in_flight개 이하, 실패하면 지수 백오프로 retries번까지 재시도
+    def __init__(self, client, max_in_flight=4, retries=3, backoff=1.0):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backoff = backoff
+
+    def jobs(self, providers=None, force=False):
+        template_hash = prompt_hash(PROMPT_TEMPLATE)
+        for provider in providers or PROVIDER_MODELS:
+            model = PROVIDER_MODELS[provider]
+            for location in locations:
+                for menu in menus:
+                    if force or self.client.cache.get(provider, model, location, menu, template_hash) is None:
+                        yield provider, location, menu
+
+    # 결과 요약 {'fetched': 새로 채운 수, 'failed': 실패한 조합 목록, 'skipped': 이미 캐시에 있던 수}
+    def run(self, providers=None, force=False):
+        providers = list(providers or PROVIDER_MODELS)
+        jobs = list(self.jobs(providers, force))
+        summary = {'fetched': 0, 'failed': [], 'skipped': len(providers) * len(locations) * len(menus) - len(jobs)}
+        if not jobs:
+            return summary
+        with ThreadPoolExecutor(self.max_in_flight) as executor:
+            futures = {executor.submit(self._fetch_with_retry, *job): job for job in jobs}
+            for future in as_completed(futures):
+                if future.result():
+                    summary['fetched'] += 1
+                else:
+                    summary['failed'].append(futures[future])
+        return summary
+
+    # client.refresh는 새 응답을 캐시에 저장하고, 같은 조합을 화면에서 동시에 요청하면 호출을 함께 사용
+    def _fetch_with_retry(self, provider, location, menu):
+        for attempt in range(self.retries + 1):
+            try:
+                if self.client.refresh(provider, location, menu):
+                    return True
+                logger.warning("추천 응답을 해석하지 못했습니다: %s %s %s", provider, location, menu)
+            except Exception as e:
+                logger.warning("추천 API 호출 실패 (%s %s %s, %d회째): %s", provider, location, menu, attempt + 1, e)
+            if attempt < self.retries:
+                # 동시에 실패한 호출이 같은 순간에 몰리지 않도록 지터를 더함
+                time.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+        return False
+
+def _load_api_keys():
+    # 환경 변수 우선, 없으면 Streamlit과 같은 .streamlit/secrets.toml
+    keys = {'openai': os.environ.get('OPENAI_API_KEY'), 'google': os.environ.get('GOOGLE_API_KEY')}
+    secrets_path = os.path.join('.streamlit', 'secrets.toml')
+    if (not keys['openai'] or not keys['google']) and os.path.exists(secrets_path):
+        import tomllib
+        with open(secrets_path, 'rb') as f:
+            secrets = tomllib.load(f)
+        keys['openai'] = keys['openai'] or secrets.get('OPENAI', {}).get('api_key')
+        keys['google'] = keys['google'] or secrets.get('GOOGLE', {}).get('api_key')
+    return keys
+
+def main():
+    parser = argparse.ArgumentParser(description='모든 지역 × 메뉴 조합의 추천 결과로 캐시를 미리 채움')
+    parser.add_argument('--providers', nargs='+', choices=list(PROVIDER_MODELS), default=list(PROVIDER_MODELS))
+    parser.add_argument('--max-in-flight', type=int, default=4)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=1.0)
+    parser.add_argument('--db', default='recommendations.db')
+    parser.add_argument('--force', action='store_true', help='캐시에 있는 조합도 다시 호출')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    keys = _load_api_keys()
+    client = RecommendationClient(keys['openai'], keys['google'], RecommendationCache(args.db))
+    prefetcher = RecommendationPrefetcher(client, args.max_in_flight, args.retries, args.backoff)
+    summary = prefetcher.run(args.providers, args.force)
+    print(f"새로 채움: {summary['fetched']}, 이미 캐시됨: {summary['skipped']}, 실패: {len(summary['failed'])}")
+    for provider, location, menu in summary['failed']:
+        print(f"  실패: {provider} {location} {menu}")
+
+if __name__ == '__main__':
+    main()
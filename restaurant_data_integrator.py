@@ -1,38 +1,392 @@
 # restaurant_data_integrator.py
 import json
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
+from functools import lru_cache
+from multiprocessing import shared_memory
+from restaurant_db_pool import get_pool
+from restaurant_normalizer import record_keys
+from restaurant_record import iter_records, write_records
+
+SIMILARITY_THRESHOLD = 0.8
+# 작업 프로세스 하나에 한 번에 넘기는 후보 쌍 수
+PAIR_CHUNK_SIZE = 50000
+
+# 증분 통합용 영속 색인: 클러스터 대표 레코드, 정확 일치 키 → 클러스터, (바이그램, 이름 길이) → 클러스터.
+# 바이그램은 대표 이름의 것을 모두 저장하므로 조회 쪽은 어떤 순서로든 접두어만 보면 됨
+DEDUP_INDEX_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS dedup_clusters (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        data TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS dedup_keys (
+        key TEXT PRIMARY KEY,
+        cluster INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS dedup_grams (
+        gram TEXT NOT NULL,
+        length INTEGER NOT NULL,
+        cluster INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_dedup_keys_cluster ON dedup_keys(cluster)',
+    'CREATE INDEX IF NOT EXISTS idx_dedup_grams_gram ON dedup_grams(gram, length)',
+    'CREATE INDEX IF NOT EXISTS idx_dedup_grams_cluster ON dedup_grams(cluster)'
+)
+
+def _grams(name):
+    # 2글자 미만 이름은 이름 자체를 토큰으로 사용 (한 글자 이름끼리는 같을 때만 0.8을 넘음)
+    if len(name) < 2:
+        return [name]
+    return [name[i:i + 2] for i in range(len(name) - 1)]
+
+# 두 이름 길이의 합이 total일 때 비율 > 0.8이면 반드시 공유하는 바이그램 수의 하한.
+# 일치 문자 수 M은 2 * total // 5 + 1 이상이고, 일치 블록 사이에는 불일치 문자가 하나 이상 있으므로
+# 블록 안의 공유 바이그램은 3M - total - 1개 이상
+def _pair_min_shared(total):
+    return 3 * (2 * total // 5 + 1) - total - 1
+
+# 길이만으로 계산한 비율 상한(real_quick_ratio)이 0.8을 넘는 상대 이름 길이
+@lru_cache(maxsize=None)
+def _partner_lengths(length):
+    return tuple(
+        other for other in range(1, 2 * length + 1)
+        if 2 * min(length, other) > SIMILARITY_THRESHOLD * (length + other)
+    )
+
+# 이름 길이가 length일 때 가능한 모든 상대에 대한 하한 중 최솟값
+@lru_cache(maxsize=None)
+def _min_shared_grams(length):
+    return max(1, min(_pair_min_shared(length + other) for other in _partner_lengths(length)))
+
+# 접두어 필터링: 드문 토큰부터 n - t + 1개만 색인/조회해도 t개 이상 공유하는 후보는 놓치지 않음.
+# 같은 바이그램이 반복되는 이름은 서로 다른 바이그램 수가 그만큼 줄어들 수 있으므로 t에서 뺌
+def _prefix_size(name, distinct):
+    if len(name) < 2:
+        return distinct
+    duplicates = len(name) - 1 - distinct
+    required = max(1, _min_shared_grams(len(name)) - duplicates)
+    return max(1, distinct - required + 1)
+
+# 비교에 필요한 값을 미리 계산: (이름, 바이그램 집합, 반복된 바이그램 수)
+def _entry(name):
+    grams = frozenset(_grams(name))
+    return name, grams, len(name) - 1 - len(grams)
+
+# 길이 조건은 색인에서 이미 걸러짐. 싼 조건부터 확인: 공유 바이그램 수 하한 → 문자 빈도(quick_ratio) → 실제 비율
+def _similar_entries(entry, other):
+    a, a_grams, a_duplicates = entry
+    b, b_grams, b_duplicates = other
+    total = len(a) + len(b)
+    if len(a) >= 2 and len(b) >= 2:
+        if len(a_grams & b_grams) < _pair_min_shared(total) - min(a_duplicates, b_duplicates):
+            return False
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.quick_ratio() > SIMILARITY_THRESHOLD and matcher.ratio() > SIMILARITY_THRESHOLD
+
+# 공유 메모리 배치: [이름 수 + 1개의 오프셋(int64)][UTF-8로 이어 붙인 이름들]
+def _share_names(names):
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = array('q', [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    header = offsets.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(header) + offsets[-1]))
+    shm.buf[:len(header)] = header
+    position = len(header)
+    for data in encoded:
+        shm.buf[position:position + len(data)] = data
+        position += len(data)
+    return shm
+
+# 작업 프로세스 전역: 초기화 때 공유 메모리에서 이름을 한 번만 읽어 둠
+_worker_entries = None
+
+def _init_worker(shm_name, count):
+    global _worker_entries
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        header = (count + 1) * 8
+        offsets = array('q')
+        offsets.frombytes(shm.buf[:header])
+        text = bytes(shm.buf[header:header + offsets[-1]])
+    finally:
+        shm.close()
+    _worker_entries = [_entry(text[offsets[i]:offsets[i + 1]].decode('utf-8')) for i in range(count)]
+
+# 후보 쌍 (i, j)를 평평하게 담은 배열을 받아 비슷한 쌍만 같은 형식으로 돌려줌
+def _score_pairs(pairs):
+    candidates = array('l')
+    candidates.frombytes(pairs)
+    matches = array('l')
+    for k in range(0, len(candidates), 2):
+        i, j = candidates[k], candidates[k + 1]
+        if _similar_entries(_worker_entries[j], _worker_entries[i]):
+            matches.append(i)
+            matches.append(j)
+    return matches.tobytes()
+
+def _fill_missing(target, restaurant):
+    for key, value in restaurant.items():
+        if key not in target or (value and not target[key]):
+            target[key] = value
+
+def _key_text(key):
+    return json.dumps(key, ensure_ascii=False)
 
 class RestaurantDataIntegrator:
-    def __init__(self):
+    # index_path를 주면 중복 제거 색인과 클러스터를 SQLite 파일에 유지하고 integrate_batch로 증분 통합
+    def __init__(self, index_path=None):
         self.restaurants = []
+        self.index_path = index_path
+        self.pool = None
+        if index_path:
+            self.pool = get_pool(index_path)
+            with self.pool.writer() as conn:
+                cursor = conn.cursor()
+                for statement in DEDUP_INDEX_SCHEMA:
+                    cursor.execute(statement)
 
     def load_data(self, filename):
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        self.restaurants.extend(data)
+        self.restaurants.extend(iter_records(filename))
 
-    def deduplicate(self):
+    # (바이그램, 이름 길이) 역색인으로 비슷할 수 있는 후보만 비교 (먼저 나온 가게를 남기는 기존 결과와 동일).
+    # workers가 1보다 크면 후보 쌍 점수 계산을 프로세스 풀에 나눠 맡김
+    def deduplicate(self, workers=0):
+        if workers > 1:
+            self._deduplicate_parallel(workers)
+            return
+        names = [restaurant['name'] for restaurant in self.restaurants]
+        rank = self._gram_rank(names)
+        index = defaultdict(list)
+        kept_names = set()
+        kept = []
         unique_restaurants = []
-        for restaurant in self.restaurants:
-            if not any(self._similar(restaurant['name'], unique['name']) for unique in unique_restaurants):
-                unique_restaurants.append(restaurant)
+        for restaurant, name in zip(self.restaurants, names):
+            if name in kept_names:
+                continue
+            entry = _entry(name)
+            prefix = self._prefix(name, entry[1], rank)
+            if self._has_similar(entry, prefix, index, kept):
+                continue
+            for gram in prefix:
+                index[gram, len(name)].append(len(kept))
+            kept_names.add(name)
+            kept.append(entry)
+            unique_restaurants.append(restaurant)
         self.restaurants = unique_restaurants
 
+    # 드문 바이그램이 앞에 오도록 하는 전역 순서
+    def _gram_rank(self, names):
+        frequency = Counter(gram for name in names for gram in set(_grams(name)))
+        return {gram: position for position, (gram, _) in
+                enumerate(sorted(frequency.items(), key=lambda item: (item[1], item[0])))}
+
+    def _prefix(self, name, grams, rank):
+        ordered = sorted(grams, key=rank.__getitem__)
+        return ordered[:_prefix_size(name, len(ordered))]
+
+    def _has_similar(self, entry, prefix, index, kept):
+        checked = set()
+        lengths = _partner_lengths(len(entry[0]))
+        for gram in prefix:
+            for length in lengths:
+                for position in index.get((gram, length), ()):
+                    if position in checked:
+                        continue
+                    checked.add(position)
+                    if _similar_entries(entry, kept[position]):
+                        return True
+        return False
+
+    # 서로 다른 이름 전체에 대해 후보 쌍을 만들고 작업 프로세스가 점수를 매긴 뒤,
+    # 이름 순서대로 '앞서 남은 이름과 비슷하지 않으면 남김'을 적용해 직렬 실행과 같은 결과를 만듦
+    def _deduplicate_parallel(self, workers):
+        first_seen = {}
+        for position, restaurant in enumerate(self.restaurants):
+            first_seen.setdefault(restaurant['name'], position)
+        names = list(first_seen)
+        neighbors = [[] for _ in names]
+        chunks = self._candidate_chunks(names)
+        if chunks:
+            shm = _share_names(names)
+            try:
+                with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(shm.name, len(names))) as executor:
+                    for result in executor.map(_score_pairs, chunks):
+                        matches = array('l')
+                        matches.frombytes(result)
+                        for k in range(0, len(matches), 2):
+                            neighbors[matches[k + 1]].append(matches[k])
+            finally:
+                shm.close()
+                shm.unlink()
+        kept = []
+        for j in range(len(names)):
+            kept.append(not any(kept[i] for i in neighbors[j]))
+        kept_positions = {first_seen[name] for name, keep in zip(names, kept) if keep}
+        self.restaurants = [restaurant for position, restaurant in enumerate(self.restaurants)
+                            if position in kept_positions]
+
+    # 앞선 이름 i와 뒤의 이름 j로 이루어진 후보 쌍을 PAIR_CHUNK_SIZE개씩 평평한 배열(bytes)로 묶음
+    def _candidate_chunks(self, names):
+        rank = self._gram_rank(names)
+        index = defaultdict(list)
+        chunks = []
+        pairs = array('l')
+        for j, name in enumerate(names):
+            prefix = self._prefix(name, set(_grams(name)), rank)
+            checked = set()
+            for gram in prefix:
+                for length in _partner_lengths(len(name)):
+                    for i in index.get((gram, length), ()):
+                        if i not in checked:
+                            checked.add(i)
+                            pairs.append(i)
+                            pairs.append(j)
+            for gram in prefix:
+                index[gram, len(name)].append(j)
+            if len(pairs) >= 2 * PAIR_CHUNK_SIZE:
+                chunks.append(pairs.tobytes())
+                pairs = array('l')
+        if pairs:
+            chunks.append(pairs.tobytes())
+        return chunks
+
     def _similar(self, a, b):
-        return SequenceMatcher(None, a, b).ratio() > 0.8
+        return SequenceMatcher(None, a, b).ratio() > SIMILARITY_THRESHOLD
 
+    # 정규화한 키(url, 이름, 전화번호, 지점명을 뗀 이름 + 주소)로 해시 조인해 O(n)에 병합.
+    # 키를 하나라도 공유하면 같은 가게로 보고(union-find), 그룹의 첫 레코드에 빈 값을 채움
     def merge_data(self):
+        parent = list(range(len(self.restaurants)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        first_with_key = {}
+        for position, restaurant in enumerate(self.restaurants):
+            for key in record_keys(restaurant):
+                other = first_with_key.setdefault(key, position)
+                if other != position:
+                    root, other_root = find(position), find(other)
+                    if root != other_root:
+                        # 먼저 나온 레코드가 그룹 대표가 되도록 작은 위치를 루트로
+                        parent[max(root, other_root)] = min(root, other_root)
+
         merged = {}
-        for restaurant in self.restaurants:
-            name = restaurant['name']
-            if name not in merged:
-                merged[name] = restaurant
+        for position, restaurant in enumerate(self.restaurants):
+            root = find(position)
+            if root not in merged:
+                merged[root] = restaurant
             else:
-                for key, value in restaurant.items():
-                    if key not in merged[name] or (value and not merged[name][key]):
-                        merged[name][key] = value
+                _fill_missing(merged[root], restaurant)
         self.restaurants = list(merged.values())
 
+    # 정확 일치 병합을 먼저 하고, 남은 레코드만 유사도 비교로 중복 제거
+    def integrate(self, workers=0):
+        self.merge_data()
+        self.deduplicate(workers)
+
+    # 새 레코드만 영속 색인과 비교: 정확 일치 키가 있으면 그 클러스터에 병합(여러 클러스터면 하나로 합침),
+    # 없으면 유사한 대표 이름이 있는지 보고 있으면 그 클러스터로, 없으면 새 클러스터를 만듦.
+    # 새로 만들어진 클러스터의 레코드 목록을 돌려줌
+    def integrate_batch(self, new_records):
+        if not self.pool:
+            raise ValueError("중복 제거 색인 경로(index_path)가 설정되지 않았습니다.")
+        added = []
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            for restaurant in new_records:
+                restaurant = dict(restaurant)
+                keys = [_key_text(key) for key in record_keys(restaurant)]
+                clusters = self._clusters_for_keys(cursor, keys)
+                if clusters:
+                    cluster = self._merge_clusters(cursor, clusters, restaurant)
+                else:
+                    cluster = self._similar_cluster(cursor, restaurant['name'])
+                    if cluster is None:
+                        cluster = self._add_cluster(cursor, restaurant)
+                        added.append(restaurant)
+                cursor.executemany('INSERT OR REPLACE INTO dedup_keys (key, cluster) VALUES (?, ?)',
+                                   [(key, cluster) for key in keys])
+        return added
+
+    def _clusters_for_keys(self, cursor, keys):
+        if not keys:
+            return []
+        placeholders = ', '.join('?' * len(keys))
+        cursor.execute(f'SELECT DISTINCT cluster FROM dedup_keys WHERE key IN ({placeholders}) ORDER BY cluster', keys)
+        return [row[0] for row in cursor.fetchall()]
+
+    # 가장 먼저 만들어진 클러스터를 남기고 나머지를 그 대표 레코드에 병합
+    def _merge_clusters(self, cursor, clusters, restaurant):
+        target = clusters[0]
+        cursor.execute('SELECT data FROM dedup_clusters WHERE id = ?', (target,))
+        data = json.loads(cursor.fetchone()[0])
+        for other in clusters[1:]:
+            cursor.execute('SELECT data FROM dedup_clusters WHERE id = ?', (other,))
+            _fill_missing(data, json.loads(cursor.fetchone()[0]))
+            cursor.execute('UPDATE dedup_keys SET cluster = ? WHERE cluster = ?', (target, other))
+            cursor.execute('DELETE FROM dedup_grams WHERE cluster = ?', (other,))
+            cursor.execute('DELETE FROM dedup_clusters WHERE id = ?', (other,))
+        _fill_missing(data, restaurant)
+        cursor.execute('UPDATE dedup_clusters SET data = ? WHERE id = ?',
+                       (json.dumps(data, ensure_ascii=False), target))
+        return target
+
+    # 색인에는 대표 이름의 바이그램이 모두 있으므로, 새 이름의 바이그램 중 드문 것부터 접두어 크기만큼만 조회
+    def _similar_cluster(self, cursor, name):
+        entry = _entry(name)
+        # 빈 이름은 빈 이름끼리만 비슷함
+        lengths = _partner_lengths(len(name)) or (0,)
+        grams = sorted(entry[1])
+        placeholders = ', '.join('?' * len(grams))
+        cursor.execute(f'SELECT gram, COUNT(*) FROM dedup_grams WHERE gram IN ({placeholders}) GROUP BY gram', grams)
+        frequency = dict(cursor.fetchall())
+        if not frequency:
+            return None
+        grams.sort(key=lambda gram: frequency.get(gram, 0))
+        prefix = grams[:_prefix_size(name, len(grams))]
+        cursor.execute(
+            f'''
+            SELECT DISTINCT c.id, c.name FROM dedup_grams g JOIN dedup_clusters c ON c.id = g.cluster
+            WHERE g.gram IN ({', '.join('?' * len(prefix))}) AND g.length IN ({', '.join('?' * len(lengths))})
+            ORDER BY c.id
+            ''',
+            prefix + list(lengths)
+        )
+        for cluster, other in cursor.fetchall():
+            if _similar_entries(entry, _entry(other)):
+                return cluster
+        return None
+
+    def _add_cluster(self, cursor, restaurant):
+        name = restaurant['name']
+        cursor.execute('INSERT INTO dedup_clusters (name, data) VALUES (?, ?)',
+                       (name, json.dumps(restaurant, ensure_ascii=False)))
+        cluster = cursor.lastrowid
+        cursor.executemany('INSERT INTO dedup_grams (gram, length, cluster) VALUES (?, ?, ?)',
+                           [(gram, len(name), cluster) for gram in set(_grams(name))])
+        return cluster
+
+    # 영속 색인의 클러스터 대표 레코드를 생성 순서대로
+    def integrated_restaurants(self):
+        if not self.pool:
+            raise ValueError("중복 제거 색인 경로(index_path)가 설정되지 않았습니다.")
+        with self.pool.reader() as conn:
+            for (data,) in conn.execute('SELECT data FROM dedup_clusters ORDER BY id'):
+                yield json.loads(data)
+
     def save_integrated_data(self, filename):
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.restaurants, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+        write_records(self.restaurants, filename)
\ No newline at end of file
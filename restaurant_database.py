@@ -1,15 +1,341 @@
 # restaurant_database.py
-import sqlite3
+import hashlib
 import json
+import math
+import re
+import unicodedata
+from restaurant_stream import iter_restaurants
+from restaurant_db_pool import get_pool
+
+# natural_key가 같은 행은 갱신하되, 내용 해시가 같으면 쓰지 않음.
+# 목록 페이지처럼 일부 항목만 있는 레코드가 상세 정보를 빈 값으로 덮어쓰지 않도록 빈 값은 기존 값을 유지
+INSERT_SQL = '''
+INSERT INTO restaurants
+(name, rating, reviews, address, phone, hours, price_range, location, menu, url, natural_key, content_hash, search_text,
+ price_min, price_max)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(natural_key) DO UPDATE SET
+    name = excluded.name,
+    rating = COALESCE(excluded.rating, rating),
+    reviews = CASE WHEN excluded.reviews > 0 THEN excluded.reviews ELSE reviews END,
+    address = COALESCE(NULLIF(excluded.address, ''), address),
+    phone = COALESCE(NULLIF(excluded.phone, ''), phone),
+    hours = COALESCE(NULLIF(excluded.hours, ''), hours),
+    price_range = COALESCE(NULLIF(excluded.price_range, ''), price_range),
+    price_min = CASE WHEN excluded.price_range != '' THEN excluded.price_min ELSE price_min END,
+    price_max = CASE WHEN excluded.price_range != '' THEN excluded.price_max ELSE price_max END,
+    location = COALESCE(NULLIF(excluded.location, ''), location),
+    menu = COALESCE(NULLIF(excluded.menu, ''), menu),
+    url = COALESCE(NULLIF(excluded.url, ''), url),
+    lat = CASE WHEN excluded.address != '' AND excluded.address IS NOT address THEN NULL ELSE lat END,
+    lon = CASE WHEN excluded.address != '' AND excluded.address IS NOT address THEN NULL ELSE lon END,
+    content_hash = excluded.content_hash,
+    search_text = search_terms(
+        excluded.name,
+        COALESCE(NULLIF(excluded.address, ''), address),
+        COALESCE(NULLIF(excluded.location, ''), location),
+        COALESCE(NULLIF(excluded.menu, ''), menu)
+    ),
+    last_updated = CURRENT_TIMESTAMP
+WHERE content_hash IS NOT excluded.content_hash
+'''
+
+# 외부 콘텐츠 FTS5 테이블. restaurants.search_text를 트리거로 동기화
+FTS_SCHEMA = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS restaurants_fts USING fts5(
+        search_text, content='restaurants', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS restaurants_fts_insert AFTER INSERT ON restaurants BEGIN
+        INSERT INTO restaurants_fts(rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS restaurants_fts_delete AFTER DELETE ON restaurants BEGIN
+        INSERT INTO restaurants_fts(restaurants_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS restaurants_fts_update AFTER UPDATE OF search_text ON restaurants BEGIN
+        INSERT INTO restaurants_fts(restaurants_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO restaurants_fts(rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    '''
+)
+
+# 좌표 R*Tree 인덱스. lat/lon이 채워진 행만 트리거로 동기화
+RTREE_SCHEMA = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS restaurants_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS restaurants_rtree_insert AFTER INSERT ON restaurants
+    WHEN new.lat IS NOT NULL AND new.lon IS NOT NULL BEGIN
+        INSERT INTO restaurants_rtree VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS restaurants_rtree_delete AFTER DELETE ON restaurants BEGIN
+        DELETE FROM restaurants_rtree WHERE id = old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS restaurants_rtree_update AFTER UPDATE OF lat, lon ON restaurants BEGIN
+        DELETE FROM restaurants_rtree WHERE id = old.id;
+        INSERT INTO restaurants_rtree
+        SELECT new.id, new.lat, new.lat, new.lon, new.lon WHERE new.lat IS NOT NULL AND new.lon IS NOT NULL;
+    END
+    '''
+)
+
+GEOCODE_CACHE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    address TEXT PRIMARY KEY,
+    lat REAL,
+    lon REAL
+)
+'''
+
+# 통계/분포 조회용 요약 테이블. restaurants 변경 시 트리거로 증분 갱신
+SUMMARY_TABLES = (
+    '''
+    CREATE TABLE IF NOT EXISTS restaurant_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL,
+        rating_sum REAL NOT NULL,
+        rating_count INTEGER NOT NULL,
+        reviews_sum INTEGER NOT NULL,
+        reviews_count INTEGER NOT NULL
+    )
+    ''',
+    'CREATE TABLE IF NOT EXISTS location_counts (location TEXT PRIMARY KEY, count INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS menu_counts (menu TEXT PRIMARY KEY, count INTEGER NOT NULL)'
+)
+
+SUMMARY_GROUPS = {'location': 'location_counts', 'menu': 'menu_counts'}
+SUMMARY_TRIGGERS = ('restaurants_summary_insert', 'restaurants_summary_delete', 'restaurants_summary_update')
+
+# restaurants가 바뀔 때마다 1씩 오르는 리비전 (차트 캐시처럼 데이터에서 만든 결과의 무효화 기준).
+# PRAGMA data_version은 연결마다 따로이고 같은 연결의 변경은 반영하지 않아 연결 풀에서는 쓸 수 없음
+DB_META_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS db_meta (id INTEGER PRIMARY KEY CHECK (id = 1), revision INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO db_meta (id, revision) VALUES (1, 0)'
+)
+BUMP_REVISION = 'UPDATE db_meta SET revision = revision + 1 WHERE id = 1'
+REVISION_TRIGGERS = ('restaurants_revision_insert', 'restaurants_revision_delete', 'restaurants_revision_update')
+
+def _revision_triggers():
+    return tuple(
+        f'CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON restaurants BEGIN {BUMP_REVISION}; END'
+        for name, event in zip(REVISION_TRIGGERS, ('INSERT', 'DELETE', 'UPDATE'))
+    )
+
+# row는 new 또는 old, sign은 +1/-1. NULL 그룹도 GROUP BY처럼 한 행으로 세기 위해 IS로 비교
+def _totals_update(row, sign):
+    return f'''
+        UPDATE restaurant_totals SET
+            total = total + {sign},
+            rating_sum = rating_sum + {sign} * IFNULL({row}.rating, 0),
+            rating_count = rating_count + {sign} * ({row}.rating IS NOT NULL),
+            reviews_sum = reviews_sum + {sign} * IFNULL({row}.reviews, 0),
+            reviews_count = reviews_count + {sign} * ({row}.reviews IS NOT NULL)
+        WHERE id = 1;
+    '''
+
+def _group_add(column, table, row):
+    return f'''
+        INSERT INTO {table} ({column}, count)
+        SELECT {row}.{column}, 0 WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {column} IS {row}.{column});
+        UPDATE {table} SET count = count + 1 WHERE {column} IS {row}.{column};
+    '''
+
+def _group_remove(column, table, row):
+    return f'''
+        UPDATE {table} SET count = count - 1 WHERE {column} IS {row}.{column};
+        DELETE FROM {table} WHERE {column} IS {row}.{column} AND count <= 0;
+    '''
+
+def _summary_triggers():
+    groups_add = {row: ''.join(_group_add(c, t, row) for c, t in SUMMARY_GROUPS.items()) for row in ('new', 'old')}
+    groups_remove = {row: ''.join(_group_remove(c, t, row) for c, t in SUMMARY_GROUPS.items()) for row in ('new', 'old')}
+    return (
+        f'''
+        CREATE TRIGGER IF NOT EXISTS restaurants_summary_insert AFTER INSERT ON restaurants BEGIN
+            {_totals_update('new', 1)}
+            {groups_add['new']}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS restaurants_summary_delete AFTER DELETE ON restaurants BEGIN
+            {_totals_update('old', -1)}
+            {groups_remove['old']}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS restaurants_summary_update
+        AFTER UPDATE OF rating, reviews, location, menu ON restaurants BEGIN
+            {_totals_update('old', -1)}
+            {_totals_update('new', 1)}
+            {groups_remove['old']}
+            {groups_add['new']}
+        END
+        '''
+    )
+
+# 가격대 문자열의 금액과 범위 구분자 (NFKC 후 ～는 ~가 됨)
+PRICE_NUMBER = re.compile(r'\d[\d,]*')
+PRICE_SEPARATOR = re.compile(r'[~〜]')
+
+# 한자·가나·한글처럼 띄어쓰기로 단어를 나눌 수 없는 문자 구간
+CJK_RUN = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+)|([^\W_]+)')
+
+# 대량 적재 중에만 쓰는 설정: 임시 데이터는 메모리에 + 큰 페이지 캐시
+# (WAL과 synchronous=NORMAL은 연결 풀이 항상 적용)
+BULK_LOAD_PRAGMAS = (
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536'
+)
+BULK_LOAD_RESET_PRAGMAS = (
+    'PRAGMA temp_store=DEFAULT',
+    'PRAGMA cache_size=-2000'
+)
+
+# bulk_load(defer_summaries=None)에서 적재한 행 수가 기존 행 수의 이 비율을 넘으면 트리거를 내리고 마지막에 재집계.
+# 재집계는 테이블 전체를 읽으므로 큰 테이블에 적은 증분을 넣을 때는 행마다 트리거를 돌리는 편이 빠름
+DEFER_SUMMARIES_RATIO = 0.2
+
+RESTAURANT_COLUMNS = ('id', 'name', 'rating', 'reviews', 'address', 'phone', 'hours',
+                      'price_range', 'price_min', 'price_max', 'location', 'menu', 'url', 'lat', 'lon', 'last_updated')
+
+# 거리 계산(_distance_km)과 같은 지구 반지름을 써야 get_nearest의 검색 범위가 실제보다 넓게 잡히지 않음
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# 스냅샷 컬럼 타입 (청크마다 pandas 추론 타입이 달라지지 않도록 고정)
+SNAPSHOT_TYPES = {
+    'id': 'int64', 'name': 'string', 'rating': 'float64', 'reviews': 'int64',
+    'address': 'string', 'phone': 'string', 'hours': 'string', 'price_range': 'string',
+    'price_min': 'int64', 'price_max': 'int64',
+    'location': 'string', 'menu': 'string', 'url': 'string',
+    'lat': 'float64', 'lon': 'float64', 'last_updated': 'string'
+}
+
+# get_restaurants 정렬 기준 → 컬럼. 각 컬럼마다 (location, menu, 컬럼, id) 복합 인덱스가 있음
+ORDER_COLUMNS = {'rating': 'rating', 'reviews': 'reviews'}
+
+def _to_rating(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None  # 평점이 없는 가게는 '-'로 수집됨
+
+def _to_reviews(value):
+    return int(str(value or '0').replace(',', ''))
+
+def _normalize(text):
+    return ''.join(unicodedata.normalize('NFKC', text or '').lower().split())
+
+# 타베로그 URL이 있으면 URL, 없으면 정규화한 이름 + 주소
+def natural_key(name, address, url):
+    if url:
+        return url
+    return 'name:' + _normalize(name) + '|' + _normalize(address)
+
+# '￥1,000～￥1,999', '～￥999', '￥10,000～' 같은 가격대 문자열 → (최저, 최고) 정수, 열린 쪽과 해석할 수 없는 값은 None
+def parse_price_range(text):
+    text = unicodedata.normalize('NFKC', text or '')
+    bounds = []
+    for part in PRICE_SEPARATOR.split(text, 1):
+        match = PRICE_NUMBER.search(part)
+        bounds.append(int(match.group().replace(',', '')) if match else None)
+    if len(bounds) == 1:
+        bounds *= 2
+    low, high = bounds
+    if low is not None and high is not None and low > high:
+        low, high = high, low
+    return low, high
+
+def content_hash(values):
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _text_runs(text):
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    for match in CJK_RUN.finditer(text):
+        yield match.group(1), match.group(2)
+
+# 검색용 토큰 문자열: CJK 구간은 2글자씩 겹쳐 자르고(마지막 글자는 단독 토큰으로도 남김),
+# 그 외 단어는 그대로 두어 unicode61 토크나이저가 처리
+def search_terms(*fields):
+    tokens = []
+    for field in fields:
+        for cjk, word in _text_runs(field):
+            if word:
+                tokens.append(word)
+                continue
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+            tokens.append(cjk[-1])
+    return ' '.join(tokens)
+
+# 검색어 → FTS5 MATCH 식. 모든 조각이 일치해야 하며 한 글자 CJK와 일반 단어는 접두어로 검색
+def match_query(text):
+    terms = []
+    for cjk, word in _text_runs(text):
+        if word:
+            terms.append(f'"{word}"*')
+        elif len(cjk) == 1:
+            terms.append(f'"{cjk}"*')
+        else:
+            terms.append('"' + ' '.join(cjk[i:i + 2] for i in range(len(cjk) - 1)) + '"')
+    return ' '.join(terms)
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _snapshot_schema(columns):
+    import pyarrow as pa
+
+    return pa.schema([(column, pa.type_for_alias(SNAPSHOT_TYPES[column])) for column in columns])
+
+# export_snapshot으로 만든 파일을 메모리 매핑으로 읽어 pyarrow Table로 반환 (.to_pandas()로 변환 가능)
+def load_snapshot(path):
+    import pyarrow as pa
+
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
 
 class RestaurantDatabase:
+    # 연결은 프로세스 전체 풀에서 빌려 쓰므로 인스턴스를 만들어도 새 연결을 열지 않음
     def __init__(self, db_name):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
-        self.create_table()
+        self.db_name = db_name
+        self.pool = get_pool(db_name)
+        if not self.pool.initialized:
+            with self.pool.writer() as conn:
+                if not self.pool.initialized:
+                    conn.create_function('search_terms', 4, search_terms, deterministic=True)
+                    self.create_table(conn.cursor())
+                    self.pool.initialized = True
 
-    def create_table(self):
-        self.cursor.execute('''
+    def _read(self, query, params=()):
+        with self.pool.reader() as conn:
+            return conn.execute(query, params).fetchall()
+
+    def create_table(self, cursor):
+        cursor.execute('''
         CREATE TABLE IF NOT EXISTS restaurants (
             id INTEGER PRIMARY KEY,
             name TEXT NOT NULL,
@@ -21,65 +347,407 @@ class RestaurantDatabase:
             price_range TEXT,
             location TEXT,
             menu TEXT,
-            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+            url TEXT,
+            natural_key TEXT,
+            content_hash TEXT,
+            search_text TEXT,
+            lat REAL,
+            lon REAL,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+            details_fetched_at DATETIME
         )
         ''')
-        self.conn.commit()
+        added = self._add_missing_columns(cursor, {
+            'url': 'TEXT', 'natural_key': 'TEXT', 'content_hash': 'TEXT', 'search_text': 'TEXT',
+            'lat': 'REAL', 'lon': 'REAL', 'price_min': 'INTEGER', 'price_max': 'INTEGER',
+            'details_fetched_at': 'DATETIME'
+        })
+        if 'natural_key' in added:
+            self._backfill_natural_keys(cursor)
+        if 'search_text' in added:
+            cursor.execute('UPDATE restaurants SET search_text = search_terms(name, address, location, menu)')
+        if 'price_min' in added:
+            self._backfill_prices(cursor)
+        cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_restaurants_natural_key ON restaurants(natural_key)
+        ''')
+        for column in ORDER_COLUMNS.values():
+            cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_restaurants_location_menu_{column}
+            ON restaurants(location, menu, {column}, id)
+            ''')
+        for statement in FTS_SCHEMA + RTREE_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(GEOCODE_CACHE_SCHEMA)
+        if 'search_text' in added:
+            cursor.execute("INSERT INTO restaurants_fts(restaurants_fts) VALUES ('rebuild')")
+        for statement in SUMMARY_TABLES:
+            cursor.execute(statement)
+        cursor.execute('SELECT COUNT(*) FROM restaurant_totals')
+        if cursor.fetchone()[0] == 0:
+            self._fill_summaries(cursor)
+        for statement in _summary_triggers():
+            cursor.execute(statement)
+        for statement in DB_META_SCHEMA + _revision_triggers():
+            cursor.execute(statement)
 
-    def insert_restaurant(self, restaurant):
-        self.cursor.execute('''
-        INSERT OR REPLACE INTO restaurants 
-        (name, rating, reviews, address, phone, hours, price_range, location, menu)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    def _fill_summaries(self, cursor):
+        cursor.execute('DELETE FROM restaurant_totals')
+        cursor.execute('''
+        INSERT INTO restaurant_totals (id, total, rating_sum, rating_count, reviews_sum, reviews_count)
+        SELECT 1, COUNT(*), IFNULL(SUM(rating), 0), COUNT(rating), IFNULL(SUM(reviews), 0), COUNT(reviews)
+        FROM restaurants
+        ''')
+        for column, table in SUMMARY_GROUPS.items():
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(f'''
+            INSERT INTO {table} ({column}, count)
+            SELECT {column}, COUNT(*) FROM restaurants GROUP BY {column}
+            ''')
+
+    def rebuild_summaries(self):
+        with self.pool.writer() as conn:
+            self._fill_summaries(conn.cursor())
+
+    # 요약 테이블을 전체 집계와 비교. 불일치 항목 목록을 반환하며 비어 있으면 일치
+    def check_summaries(self):
+        mismatches = []
+        total, avg_rating, avg_reviews = self._read('''
+        SELECT COUNT(*), AVG(rating), AVG(reviews) FROM restaurants
+        ''')[0]
+        stats = self.get_restaurant_stats()
+        if self.get_total_restaurants() != total:
+            mismatches.append('total')
+        for name, expected in (('avg_rating', avg_rating), ('avg_reviews', avg_reviews)):
+            actual = stats[name]
+            if (actual is None) != (expected is None) or (expected is not None and abs(actual - expected) > 1e-6):
+                mismatches.append(name)
+        for column, distribution in (('location', self.get_location_distribution()),
+                                     ('menu', self.get_menu_distribution())):
+            if dict(self._read(f'SELECT {column}, COUNT(*) FROM restaurants GROUP BY {column}')) != distribution:
+                mismatches.append(column)
+        return mismatches
+
+    # 이전 버전 스키마로 만들어진 DB에 새 컬럼을 추가
+    def _add_missing_columns(self, cursor, columns):
+        cursor.execute('PRAGMA table_info(restaurants)')
+        existing = {row[1] for row in cursor.fetchall()}
+        added = []
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f'ALTER TABLE restaurants ADD COLUMN {name} {column_type}')
+                added.append(name)
+        return added
+
+    # 키가 없던 시절에 중복으로 쌓인 행은 가장 최근 것만 남김
+    def _backfill_natural_keys(self, cursor):
+        cursor.execute('''
+        SELECT id, name, rating, reviews, address, phone, hours, price_range, location, menu, url
+        FROM restaurants
+        ''')
+        updates = [
+            (natural_key(row[1], row[4], row[10]), content_hash(list(row[1:])), row[0])
+            for row in cursor.fetchall()
+        ]
+        cursor.executemany('UPDATE restaurants SET natural_key = ?, content_hash = ? WHERE id = ?', updates)
+        cursor.execute('''
+        DELETE FROM restaurants
+        WHERE id NOT IN (SELECT MAX(id) FROM restaurants GROUP BY natural_key)
+        ''')
+
+    def _backfill_prices(self, cursor):
+        cursor.execute("SELECT id, price_range FROM restaurants WHERE price_range IS NOT NULL AND price_range != ''")
+        cursor.executemany('UPDATE restaurants SET price_min = ?, price_max = ? WHERE id = ?',
+                           [parse_price_range(price) + (row_id,) for row_id, price in cursor.fetchall()])
+
+    def _row(self, restaurant):
+        values = [
             restaurant['name'],
-            float(restaurant['rating']),
-            int(restaurant.get('reviews', '0').replace(',', '')),
+            _to_rating(restaurant['rating']),
+            _to_reviews(restaurant.get('reviews', '0')),
             restaurant.get('address', ''),
             restaurant.get('phone', ''),
             restaurant.get('hours', ''),
             restaurant.get('price_range', ''),
             restaurant.get('location', ''),
-            restaurant.get('menu', '')
-        ))
-        self.conn.commit()
+            restaurant.get('menu', ''),
+            restaurant.get('url', '')
+        ]
+        return tuple(values) + (
+            natural_key(values[0], values[3], values[9]),
+            content_hash(values),
+            search_terms(values[0], values[3], values[7], values[8])
+        ) + parse_price_range(values[6])
+
+    def insert_restaurant(self, restaurant):
+        with self.pool.writer() as conn:
+            conn.execute(INSERT_SQL, self._row(restaurant))
+
+    # 이터레이터로 받은 레코드를 batch_size씩 executemany로 넣고 전체를 한 트랜잭션으로 커밋.
+    # 실제로 추가되거나 내용이 바뀐 행 수를 반환.
+    # 요약/리비전 트리거를 미루면 행마다 돌리지 않고 같은 트랜잭션 안에서 마지막에 한 번 재집계함.
+    # defer_summaries가 True면 처음부터, False면 미루지 않고, None이면 적재한 행 수가
+    # 기존 행 수 × DEFER_SUMMARIES_RATIO를 넘는 시점부터 미룸 (빈 테이블이면 처음부터)
+    def bulk_load(self, restaurants, batch_size=1000, tune=True, defer_summaries=None):
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            if tune:
+                for pragma in BULK_LOAD_PRAGMAS:
+                    cursor.execute(pragma)
+            written = 0
+            loaded = 0
+            deferred = False
+            try:
+                cursor.execute('BEGIN')
+                if defer_summaries is None:
+                    cursor.execute('SELECT total FROM restaurant_totals WHERE id = 1')
+                    defer_after = cursor.fetchone()[0] * DEFER_SUMMARIES_RATIO
+                else:
+                    defer_after = 0 if defer_summaries else None
+                for batch in _batches(map(self._row, restaurants), batch_size):
+                    if not deferred and defer_after is not None and loaded + len(batch) > defer_after:
+                        for name in SUMMARY_TRIGGERS + REVISION_TRIGGERS:
+                            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+                        deferred = True
+                    cursor.executemany(INSERT_SQL, batch)
+                    written += cursor.rowcount
+                    loaded += len(batch)
+                if deferred:
+                    self._fill_summaries(cursor)
+                    if written:
+                        cursor.execute(BUMP_REVISION)
+                    for statement in _summary_triggers() + _revision_triggers():
+                        cursor.execute(statement)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                if tune:
+                    for pragma in BULK_LOAD_RESET_PRAGMAS:
+                        cursor.execute(pragma)
+        return written
 
     def load_from_json(self, filename):
-        with open(filename, 'r', encoding='utf-8') as f:
-            restaurants = json.load(f)
-        for restaurant in restaurants:
-            self.insert_restaurant(restaurant)
+        # .jsonl 스트림은 한 줄씩 읽어서 넣음
+        return self.bulk_load(iter_restaurants(filename))
+
+    # 상세 페이지를 아직 받지 않았거나 마지막으로 받은 지 max_age_days가 지난 행.
+    # 목록 적재로 바뀌는 last_updated와 따로 관리하고, 상세 페이지에 주소가 없는 가게도 주기마다 한 번만 가져옴
+    def get_stale_restaurants(self, max_age_days):
+        return self._read('''
+        SELECT id, url FROM restaurants
+        WHERE url IS NOT NULL AND url != ''
+          AND (details_fetched_at IS NULL OR details_fetched_at < datetime('now', ?))
+        ''', (f'-{max_age_days} days',))
+
+    # 상세 페이지를 받았으면 파싱된 항목이 없어도 호출해 details_fetched_at을 기록
+    def update_details(self, restaurant_id, details):
+        if not details:
+            with self.pool.writer() as conn:
+                conn.execute('UPDATE restaurants SET details_fetched_at = CURRENT_TIMESTAMP WHERE id = ?',
+                             (restaurant_id,))
+            return
+        params = {field: details.get(field) for field in
+                  ('rating', 'reviews', 'address', 'phone', 'hours', 'price_range', 'location', 'menu')}
+        params['price_min'], params['price_max'] = parse_price_range(params['price_range'])
+        params['id'] = restaurant_id
+        with self.pool.writer() as conn:
+            conn.execute('''
+            UPDATE restaurants SET
+                rating = COALESCE(:rating, rating),
+                reviews = COALESCE(:reviews, reviews),
+                address = COALESCE(:address, address),
+                phone = COALESCE(:phone, phone),
+                hours = COALESCE(:hours, hours),
+                price_range = COALESCE(:price_range, price_range),
+                price_min = CASE WHEN :price_range IS NOT NULL THEN :price_min ELSE price_min END,
+                price_max = CASE WHEN :price_range IS NOT NULL THEN :price_max ELSE price_max END,
+                lat = CASE WHEN :address IS NOT NULL AND :address IS NOT address THEN NULL ELSE lat END,
+                lon = CASE WHEN :address IS NOT NULL AND :address IS NOT address THEN NULL ELSE lon END,
+                location = COALESCE(NULLIF(location, ''), :location),
+                menu = COALESCE(NULLIF(menu, ''), :menu),
+                search_text = search_terms(
+                    name,
+                    COALESCE(:address, address),
+                    COALESCE(NULLIF(location, ''), :location),
+                    COALESCE(NULLIF(menu, ''), :menu)
+                ),
+                last_updated = CURRENT_TIMESTAMP,
+                details_fetched_at = CURRENT_TIMESTAMP
+            WHERE id = :id
+            ''', params)
+
+    def _restaurants_query(self, location, menu, min_rating, order_by, limit, after):
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"지원하지 않는 정렬 기준입니다: {order_by}")
+        column = ORDER_COLUMNS[order_by]
+        conditions = [f'{column} IS NOT NULL']
+        params = []
+        if location is not None:
+            conditions.append('location = ?')
+            params.append(location)
+        if menu is not None:
+            conditions.append('menu = ?')
+            params.append(menu)
+        if min_rating is not None:
+            conditions.append('rating >= ?')
+            params.append(min_rating)
+        if after is not None:
+            conditions.append(f'({column}, id) < (?, ?)')
+            params.extend(after)
+        params.append(limit)
+        query = f'''
+        SELECT {', '.join(RESTAURANT_COLUMNS)} FROM restaurants
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {column} DESC, id DESC
+        LIMIT ?
+        '''
+        return query, params
+
+    # 키셋 페이지네이션: 다음 페이지는 after=(마지막 행의 order_by 값, 마지막 행의 id)로 요청
+    def get_restaurants(self, location=None, menu=None, min_rating=None, order_by='rating', limit=20, after=None):
+        query, params = self._restaurants_query(location, menu, min_rating, order_by, limit, after)
+        return [dict(zip(RESTAURANT_COLUMNS, row)) for row in self._read(query, params)]
+
+    # 인덱스 사용 여부 확인용 EXPLAIN QUERY PLAN 결과
+    def explain_get_restaurants(self, location=None, menu=None, min_rating=None, order_by='rating', limit=20, after=None):
+        query, params = self._restaurants_query(location, menu, min_rating, order_by, limit, after)
+        return [row[3] for row in self._read('EXPLAIN QUERY PLAN ' + query, params)]
+
+    # 이름·주소·지역·메뉴 자유 검색. bm25 순위, 같은 순위면 평점 높은 순
+    def search(self, text, limit=20):
+        query = match_query(text)
+        if not query:
+            return []
+        columns = ', '.join('r.' + column for column in RESTAURANT_COLUMNS)
+        rows = self._read(f'''
+        SELECT {columns} FROM restaurants_fts
+        JOIN restaurants r ON r.id = restaurants_fts.rowid
+        WHERE restaurants_fts MATCH ?
+        ORDER BY restaurants_fts.rank, r.rating DESC
+        LIMIT ?
+        ''', (query, limit))
+        return [dict(zip(RESTAURANT_COLUMNS, row)) for row in rows]
+
+    # 찾은 좌표만 geocode_cache에 남겨 같은 주소는 다시 찾지 않음.
+    # 못 찾은 주소는 이번 실행(memo)에서만 기억해, 지명 사전을 보강하면 다음 실행에서 다시 시도함
+    # (이전 버전이 남긴 (NULL, NULL) 행도 무시)
+    def _geocode(self, conn, geocoder, text, memo):
+        if text not in memo:
+            cached = conn.execute('''
+            SELECT lat, lon FROM geocode_cache WHERE address = ? AND lat IS NOT NULL
+            ''', (text,)).fetchone()
+            if cached is None:
+                cached = geocoder.lookup(text)
+                if cached:
+                    conn.execute('INSERT OR REPLACE INTO geocode_cache (address, lat, lon) VALUES (?, ?, ?)',
+                                 (text,) + tuple(cached))
+            memo[text] = tuple(cached) if cached else None
+        return memo[text]
+
+    # 좌표가 없는 행을 지명 사전(restaurant_geocoder.Gazetteer)으로 채움. 주소가 없거나 주소로 못 찾으면 지역 코드로 대신함
+    # (목록 페이지에서만 수집해 아직 주소가 없는 행도 지도에 표시되도록).
+    # 좌표의 정밀도는 지명 사전의 단위를 따름 — 기본 gazetteer_tokyo.csv로는 지역 중심점 수준
+    def geocode_missing(self, geocoder):
+        memo = {}
+        updates = []
+        with self.pool.writer() as conn:
+            rows = conn.execute('SELECT id, address, location FROM restaurants WHERE lat IS NULL').fetchall()
+            for restaurant_id, address, location in rows:
+                coords = self._geocode(conn, geocoder, address, memo) if address else None
+                if not coords and location:
+                    coords = self._geocode(conn, geocoder, location, memo)
+                if coords:
+                    updates.append(coords + (restaurant_id,))
+            conn.executemany('UPDATE restaurants SET lat = ?, lon = ? WHERE id = ?', updates)
+        return len(updates)
+
+    def _rows_in_box(self, south, west, north, east, limit):
+        columns = ', '.join('r.' + column for column in RESTAURANT_COLUMNS)
+        query = f'''
+        SELECT {columns} FROM restaurants_rtree t
+        JOIN restaurants r ON r.id = t.id
+        WHERE t.max_lat >= ? AND t.min_lat <= ? AND t.max_lon >= ? AND t.min_lon <= ?
+          AND r.lat BETWEEN ? AND ? AND r.lon BETWEEN ? AND ?
+        ORDER BY r.rating DESC
+        '''
+        params = [south, north, west, east, south, north, west, east]
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [dict(zip(RESTAURANT_COLUMNS, row)) for row in self._read(query, params)]
+
+    # 지도 화면 영역 안의 가게 (평점 높은 순)
+    def get_in_bbox(self, south, west, north, east, limit=500):
+        return self._rows_in_box(south, west, north, east, limit)
+
+    # 가장 가까운 k개. 검색 상자를 두 배씩 넓히며, 상자 안에 내접하는 원 안에 k개가 들어오면 확정.
+    # 지역 중심점 수준 좌표(기본 지명 사전)에서는 같은 지역의 가게가 모두 같은 거리로 나옴
+    def get_nearest(self, lat, lon, k=10, radius_deg=0.005):
+        while True:
+            rows = self._rows_in_box(lat - radius_deg, lon - radius_deg, lat + radius_deg, lon + radius_deg, None)
+            for row in rows:
+                row['distance_km'] = _distance_km(lat, lon, row['lat'], row['lon'])
+            rows.sort(key=lambda row: row['distance_km'])
+            max_lat = min(abs(lat) + radius_deg, 90)
+            covered_km = radius_deg * KM_PER_DEGREE * math.cos(math.radians(max_lat))
+            if radius_deg >= 180 or (len(rows) >= k and rows[k - 1]['distance_km'] <= covered_km):
+                return rows[:k]
+            radius_deg *= 2
+
+    # 행마다 파이썬 객체를 만들지 않고 chunksize 행씩 DataFrame으로 읽음
+    def iter_dataframes(self, chunksize=50000, columns=RESTAURANT_COLUMNS):
+        import pandas as pd
+
+        query = f"SELECT {', '.join(columns)} FROM restaurants ORDER BY id"
+        with self.pool.reader() as conn:
+            yield from pd.read_sql_query(query, conn, chunksize=chunksize)
+
+    # 열 지향 스냅샷 저장. .parquet이면 Parquet, 그 외(.feather/.arrow)는 메모리 매핑 가능한 Arrow IPC 파일
+    def export_snapshot(self, path, chunksize=50000, columns=RESTAURANT_COLUMNS):
+        import pyarrow as pa
+
+        schema = _snapshot_schema(columns)
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(path, schema)
+        else:
+            writer = pa.ipc.new_file(path, schema)
+        rows = 0
+        try:
+            for df in self.iter_dataframes(chunksize, columns):
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+                writer.write_table(table)
+                rows += table.num_rows
+        finally:
+            writer.close()
+        return rows
+
+    def get_revision(self):
+        return self._read('SELECT revision FROM db_meta WHERE id = 1')[0][0]
 
     def get_total_restaurants(self):
-        self.cursor.execute('SELECT COUNT(*) FROM restaurants')
-        return self.cursor.fetchone()[0]
+        return self._read('SELECT total FROM restaurant_totals WHERE id = 1')[0][0]
 
     def get_restaurant_stats(self):
-        self.cursor.execute('''
-        SELECT AVG(rating) as avg_rating, AVG(reviews) as avg_reviews
-        FROM restaurants
-        ''')
-        result = self.cursor.fetchone()
+        result = self._read('''
+        SELECT
+            CASE WHEN rating_count > 0 THEN rating_sum / rating_count END as avg_rating,
+            CASE WHEN reviews_count > 0 THEN CAST(reviews_sum AS REAL) / reviews_count END as avg_reviews
+        FROM restaurant_totals WHERE id = 1
+        ''')[0]
         return {
             'avg_rating': result[0],
             'avg_reviews': result[1]
         }
 
     def get_location_distribution(self):
-        self.cursor.execute('''
-        SELECT location, COUNT(*) as count
-        FROM restaurants
-        GROUP BY location
-        ''')
-        return dict(self.cursor.fetchall())
+        return dict(self._read('SELECT location, count FROM location_counts'))
 
     def get_menu_distribution(self):
-        self.cursor.execute('''
-        SELECT menu, COUNT(*) as count
-        FROM restaurants
-        GROUP BY menu
-        ''')
-        return dict(self.cursor.fetchall())
+        return dict(self._read('SELECT menu, count FROM menu_counts'))
 
+    # 풀은 다른 세션과 공유되므로 여기서 닫지 않음 (종료 시 restaurant_db_pool.close_all_pools 사용)
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.pool = None
\ No newline at end of file
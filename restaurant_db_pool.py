@@ -0,0 +1,108 @@
+# restaurant_db_pool.py
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+# 프로세스 전체에서 DB 파일마다 하나의 풀을 공유 (Streamlit 세션/재실행 간에도 재사용)
+_pools = {}
+_pools_lock = threading.Lock()
+
+class ConnectionPool:
+    # 조회는 읽기 전용 연결 여러 개로 동시에, 쓰기는 하나의 연결을 잠금으로 직렬화
+    def __init__(self, db_name, max_readers=8, timeout=30):
+        self.db_name = db_name
+        self.max_readers = max_readers
+        self.timeout = timeout
+        self.in_memory = db_name == ':memory:'
+        self.writer_lock = threading.RLock()
+        self.writer_conn = sqlite3.connect(db_name, timeout=timeout, check_same_thread=False)
+        if not self.in_memory:
+            # WAL에서는 읽기와 쓰기가 서로를 막지 않음
+            self.writer_conn.execute('PRAGMA journal_mode=WAL')
+            self.writer_conn.execute('PRAGMA synchronous=NORMAL')
+        self.readers = queue.LifoQueue()
+        self.reader_count = 0
+        self.reader_count_lock = threading.Lock()
+        self.initialized = False
+
+    def _connect_reader(self):
+        uri = 'file:' + quote(os.path.abspath(self.db_name)) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        conn.execute('PRAGMA query_only=1')
+        return conn
+
+    def _acquire_reader(self):
+        try:
+            return self.readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self.reader_count_lock:
+            create = self.reader_count < self.max_readers
+            if create:
+                self.reader_count += 1
+        if create:
+            try:
+                return self._connect_reader()
+            except Exception:
+                with self.reader_count_lock:
+                    self.reader_count -= 1
+                raise
+        return self.readers.get()
+
+    @contextmanager
+    def reader(self):
+        if self.in_memory:
+            # 메모리 DB는 연결 간에 공유되지 않으므로 쓰기 연결을 잠금과 함께 사용
+            with self.writer_lock:
+                yield self.writer_conn
+            return
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self.readers.put(conn)
+
+    @contextmanager
+    def writer(self):
+        with self.writer_lock:
+            try:
+                yield self.writer_conn
+                self.writer_conn.commit()
+            except Exception:
+                self.writer_conn.rollback()
+                raise
+
+    def close(self):
+        with self.writer_lock:
+            while True:
+                try:
+                    self.readers.get_nowait().close()
+                except queue.Empty:
+                    break
+            self.writer_conn.close()
+
+def get_pool(db_name, max_readers=8):
+    # 메모리 DB는 인스턴스마다 별도의 DB이므로 공유하지 않음
+    if db_name == ':memory:':
+        return ConnectionPool(db_name, max_readers)
+    key = os.path.abspath(db_name)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_name, max_readers)
+        return _pools[key]
+
+def close_pool(db_name):
+    with _pools_lock:
+        pool = _pools.pop(os.path.abspath(db_name), None)
+    if pool:
+        pool.close()
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,29 @@
+# restaurant_geocoder.py
+import csv
+import unicodedata
+
+# 함께 배포하는 gazetteer_tokyo.csv는 자리표시용: 앱의 7개 지역 중심점만 들어 있어 모든 가게가 그 7개 점 중 하나로 지오코딩됨.
+# 가게 단위 지도·최근접 검색에 쓰려면 丁目(블록) 단위 지명 CSV(같은 name,lat,lon 형식)로 바꿔야 함
+
+def _normalize(text):
+    return ''.join(unicodedata.normalize('NFKC', text or '').lower().split())
+
+class Gazetteer:
+    # 오프라인 지오코더: name,lat,lon 형식의 CSV에서 주소에 포함된 가장 긴 지명을 찾음
+    def __init__(self, filename):
+        self.places = {}
+        with open(filename, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                name = _normalize(row['name'])
+                if name:
+                    self.places[name] = (float(row['lat']), float(row['lon']))
+        self.lengths = sorted({len(name) for name in self.places}, reverse=True)
+
+    def lookup(self, text):
+        text = _normalize(text)
+        for length in self.lengths:
+            for start in range(len(text) - length + 1):
+                coords = self.places.get(text[start:start + length])
+                if coords:
+                    return coords
+        return None
@@ -0,0 +1,84 @@
+# restaurant_normalizer.py
+import re
+import unicodedata
+from functools import lru_cache
+
+# 같은 문자열이 여러 레코드에 반복되므로 정규화 결과를 기억해 둠
+NORMALIZE_CACHE_SIZE = 100000
+
+# 지점명: 끝의 괄호 부분 '(銀座店)', 공백 뒤에 붙은 '銀座店', 붙여 쓴 '本店' 등
+BRANCH_SUFFIX = re.compile(
+    r'\s*[(\[【〈《「][^()\[\]【】〈〉《》「」]*[)\]】〉》」]$'
+    r'|\s+\S*店$'
+    r'|(本店|支店|別館|新館)$'
+)
+POSTAL_CODE = re.compile(r'〒?\s*\d{3}-\d{4}')
+PREFECTURE = re.compile(r'^(東京都|北海道|(京都|大阪)府|\S{2,3}県)')
+DASHES = re.compile(r'(?<=\d)[‐‑‒–—―−ーｰ－](?=\d)')
+BLOCK_NUMBER = re.compile(r'(?<=\d)(丁目|番地|番|の)(?=\d)')
+BLOCK_TAIL = re.compile(r'(?<=\d)(番地|番|号)(?!\d)')
+
+def _fold_kana(text):
+    # 가타카나 → 히라가나 (ー 같은 장음 기호는 그대로)
+    return ''.join(chr(ord(c) - 0x60) if 'ァ' <= c <= 'ヶ' else c for c in text)
+
+def _strip_punctuation(text, keep=''):
+    # 구두점(P), 기호(S), 공백(Z) 문자를 모두 제거 (keep에 있는 문자는 남김)
+    return ''.join(c for c in text if c in keep or unicodedata.category(c)[0] not in 'PSZ')
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return _strip_punctuation(_fold_kana(text))
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_name(name):
+    # 지점명을 뗀 이름, 떼고 나서 아무것도 남지 않으면 전체 이름
+    text = unicodedata.normalize('NFKC', name or '').strip()
+    stripped = text
+    while True:
+        shorter = BRANCH_SUFFIX.sub('', stripped).strip()
+        if shorter == stripped or not normalize_text(shorter):
+            break
+        stripped = shorter
+    return normalize_text(stripped)
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_phone(phone):
+    # 숫자만 남기고 국가번호(+81)는 0으로 바꿈, 전화번호로 보기 어려우면 None
+    text = unicodedata.normalize('NFKC', phone or '')
+    digits = ''.join(c for c in text if c.isdigit())
+    if text.lstrip().startswith('+81'):
+        digits = '0' + digits[2:]
+    if not 10 <= len(digits) <= 11:
+        return None
+    return digits
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_address(address):
+    # 우편번호와 도도부현을 떼고 '4丁目2番15号' → '4-2-15' 형태로 통일
+    text = unicodedata.normalize('NFKC', address or '')
+    text = ''.join(POSTAL_CODE.sub('', text).split())
+    text = PREFECTURE.sub('', text)
+    text = DASHES.sub('-', text)
+    text = BLOCK_NUMBER.sub('-', text)
+    text = BLOCK_TAIL.sub('', text)
+    return _strip_punctuation(_fold_kana(text.lower()), keep='-') or None
+
+def record_keys(restaurant):
+    # 같은 가게로 볼 수 있는 정확 일치 키 목록
+    keys = []
+    url = restaurant.get('url')
+    if url:
+        keys.append(('url', url))
+    name = normalize_text(restaurant.get('name'))
+    if name:
+        keys.append(('name', name))
+    phone = normalize_phone(restaurant.get('phone'))
+    if phone:
+        keys.append(('phone', phone))
+    address = normalize_address(restaurant.get('address'))
+    branch_name = normalize_name(restaurant.get('name'))
+    if address and branch_name:
+        keys.append(('name_address', branch_name, address))
+    return keys
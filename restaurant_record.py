@@ -0,0 +1,129 @@
+# restaurant_record.py
+import json
+import sys
+from collections.abc import MutableMapping
+from restaurant_stream import iter_restaurants
+
+# 스크래퍼/상세 크롤러가 만드는 필드는 슬롯에, 그 밖의 필드만 별도 dict에 저장
+RECORD_FIELDS = ('name', 'rating', 'reviews', 'url', 'location', 'menu', 'address', 'phone', 'hours', 'price_range')
+# 값 종류가 적어 레코드마다 같은 문자열이 반복되는 필드는 intern으로 하나만 유지
+INTERNED_FIELDS = frozenset(('location', 'menu'))
+
+class RestaurantRecord(MutableMapping):
+    # dict처럼 쓸 수 있는 가게 레코드. 설정되지 않은 슬롯은 키가 없는 것으로 취급
+    __slots__ = RECORD_FIELDS + ('_extra',)
+    _fields = frozenset(RECORD_FIELDS)
+
+    def __init__(self, data=(), **fields):
+        self.update(data, **fields)
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        extra = getattr(self, '_extra', None)
+        if extra is None:
+            raise KeyError(key)
+        return extra[key]
+
+    def __setitem__(self, key, value):
+        if key in INTERNED_FIELDS and type(value) is str:
+            value = sys.intern(value)
+        if key in self._fields:
+            setattr(self, key, value)
+            return
+        extra = getattr(self, '_extra', None)
+        if extra is None:
+            extra = self._extra = {}
+        extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        extra = getattr(self, '_extra', None)
+        if extra is None:
+            raise KeyError(key)
+        del extra[key]
+
+    def __iter__(self):
+        for field in RECORD_FIELDS:
+            if hasattr(self, field):
+                yield field
+        extra = getattr(self, '_extra', None)
+        if extra:
+            yield from extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in self._fields:
+            return hasattr(self, key)
+        extra = getattr(self, '_extra', None)
+        return extra is not None and key in extra
+
+    def __repr__(self):
+        return f'RestaurantRecord({self.to_dict()!r})'
+
+    def to_dict(self):
+        return dict(self.items())
+
+def iter_records(filename):
+    for restaurant in iter_restaurants(filename):
+        yield RestaurantRecord(restaurant)
+
+def write_records(records, filename):
+    # .jsonl은 한 줄에 하나씩, 그 밖에는 json.dump(indent=4)와 같은 모양의 배열을 레코드 단위로 기록
+    with open(filename, 'w', encoding='utf-8') as f:
+        if filename.endswith('.jsonl'):
+            for record in records:
+                f.write(json.dumps(_plain(record), ensure_ascii=False) + '\n')
+            return
+        first = True
+        for record in records:
+            text = json.dumps(_plain(record), ensure_ascii=False, indent=4)
+            f.write(('[\n' if first else ',\n') + '    ' + text.replace('\n', '\n    '))
+            first = False
+        f.write('[]' if first else '\n]')
+
+def _plain(record):
+    return record.to_dict() if isinstance(record, RestaurantRecord) else record
+
+if __name__ == '__main__':
+    # 메모리 비교: 같은 JSONL 줄을 dict 목록과 RestaurantRecord 목록으로 읽었을 때 남는 메모리
+    import random
+    import tracemalloc
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    locations = ['shibuya', 'shinjuku', 'ginza', 'roppongi', 'asakusa', 'ueno', 'ikebukuro']
+    menus = ['sushi', 'ramen', 'yakiniku', 'izakaya', 'tempura', 'soba', 'udon']
+    lines = [
+        json.dumps({
+            'name': f'店{i}',
+            'rating': round(random.uniform(3.0, 4.5), 2),
+            'reviews': random.randint(0, 2000),
+            'url': f'https://tabelog.com/tokyo/A1301/A130101/{13000000 + i}/',
+            'location': random.choice(locations),
+            'menu': random.choice(menus)
+        }, ensure_ascii=False)
+        for i in range(count)
+    ]
+
+    def measure(build):
+        tracemalloc.start()
+        records = [build(json.loads(line)) for line in lines]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return len(records), current
+
+    _, dict_bytes = measure(dict)
+    _, record_bytes = measure(RestaurantRecord)
+    print(f'{count}개 레코드')
+    print(f'dict:             {dict_bytes / 1024 / 1024:8.1f} MiB')
+    print(f'RestaurantRecord: {record_bytes / 1024 / 1024:8.1f} MiB ({record_bytes / dict_bytes:.0%})')
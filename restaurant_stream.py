@@ -0,0 +1,136 @@
+# restaurant_stream.py
+import json
+import os
+import threading
+
+# .json 배열을 나눠 읽는 단위 (문자 수)
+READ_CHUNK_SIZE = 1 << 16
+
+# save_to_json/write_records가 만드는 최상위 배열을 조각씩 읽어 원소를 하나씩 반환.
+# 버퍼에는 아직 처리하지 않은 부분만 남기므로 메모리는 가장 큰 원소 하나 + 조각 크기 정도만 사용
+def _iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ',')):
+            position += 1
+        if position < len(buffer):
+            char = buffer[position]
+            if not started:
+                if char != '[':
+                    raise json.JSONDecodeError("Expecting '['", buffer, position)
+                started = True
+                position += 1
+                continue
+            if char == ']':
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # 버퍼 끝에서 끝난 값(숫자 등)은 다음 조각에 이어질 수 있으므로 더 읽은 뒤 다시 해석
+            if end is not None and (end < len(buffer) or eof):
+                yield value
+                position = end
+                continue
+        elif eof:
+            raise json.JSONDecodeError('Unexpected end of JSON array', buffer, position)
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def iter_restaurants(filename):
+    # .jsonl은 한 줄씩, 기존 .json 배열 파일은 조각씩 나눠 읽어 어느 쪽도 파일 전체를 메모리에 올리지 않음
+    if filename.endswith('.jsonl'):
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 중단된 실행이 남긴 불완전한 줄
+    else:
+        with open(filename, 'r', encoding='utf-8') as f:
+            yield from _iter_json_array(f)
+
+def _open_append(filename):
+    # 이전 실행이 줄 중간에서 끊겼으면 다음 기록이 이어 붙지 않도록 줄바꿈을 보충
+    needs_newline = False
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        with open(filename, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    f = open(filename, 'a', encoding='utf-8')
+    if needs_newline:
+        f.write('\n')
+    return f
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+class CrawlCheckpoint:
+    # 완료된 (지역, 메뉴, 페이지) 키를 한 줄씩 기록
+    def __init__(self, filename):
+        self.filename = filename
+        self.completed = set()
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) == 3 and parts[2].isdigit():
+                        self.completed.add((parts[0], parts[1], int(parts[2])))
+        self.file = _open_append(filename)
+
+    def is_done(self, area, cuisine, page):
+        return (area, cuisine, page) in self.completed
+
+    def mark_done(self, area, cuisine, page):
+        self.file.write(f"{area}\t{cuisine}\t{page}\n")
+        _sync(self.file)
+        self.completed.add((area, cuisine, page))
+
+    def close(self):
+        self.file.close()
+
+class JsonlWriter:
+    # 페이지 단위로 레코드를 JSONL에 추가하고, 기록이 디스크에 반영된 뒤 체크포인트를 남김.
+    # 비동기 크롤러가 여러 스레드에서 write_page를 부르므로 페이지 하나의 기록은 잠금 안에서 끝냄
+    def __init__(self, filename, checkpoint_filename=None):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.file = _open_append(filename)
+        self.checkpoint = CrawlCheckpoint(checkpoint_filename or filename + '.checkpoint')
+
+    def is_done(self, area, cuisine, page):
+        return self.checkpoint.is_done(area, cuisine, page)
+
+    def write_page(self, area, cuisine, page, restaurants):
+        lines = []
+        for restaurant in restaurants:
+            record = dict(restaurant)
+            record.setdefault('location', area)
+            record.setdefault('menu', cuisine)
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        with self.lock:
+            self.file.writelines(lines)
+            _sync(self.file)
+            self.checkpoint.mark_done(area, cuisine, page)
+
+    def close(self):
+        self.file.close()
+        self.checkpoint.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
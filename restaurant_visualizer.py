@@ -1,43 +1,119 @@
 # restaurant_visualizer.py
-import matplotlib.pyplot as plt
-import sqlite3
+import io
+import os
+import threading
+from restaurant_db_pool import get_pool
+
+# (라벨, 상한) — 가격은 최저가 기준, '～￥999'처럼 최저가가 없으면 최고가 기준
+PRICE_BUCKETS = (('~¥1000', 1000), ('¥1000~¥2000', 2000), ('¥2000~¥3000', 3000), ('¥3000~', None))
+
+RENDER_FORMATS = ('png', 'svg')
+
+# (DB 경로, 형식) → (리비전, 이미지 바이트). 프로세스 전체(Streamlit 세션 간)에서 공유
+_render_cache = {}
+_render_cache_lock = threading.Lock()
+
+def _figure(**kwargs):
+    # matplotlib은 차트를 실제로 그릴 때만 불러오고, 화면 없는 서버에서도 동작하도록 Agg 백엔드를 사용.
+    # pyplot 대신 Figure를 직접 만들어 전역 상태나 닫지 않은 figure가 쌓이지 않음
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
 
 class RestaurantVisualizer:
     def __init__(self, db_name):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
+        self.db_name = db_name
+        self.pool = get_pool(db_name)
+
+    # restaurants가 바뀔 때마다 트리거가 올리는 리비전 (RestaurantDatabase.get_revision과 같은 값)
+    def get_revision(self):
+        with self.pool.reader() as conn:
+            return conn.execute('SELECT revision FROM db_meta WHERE id = 1').fetchone()[0]
+
+    # 평점 히스토그램을 DB 안에서 집계해 (구간별 개수, 구간 경계)를 반환.
+    # 구간은 plt.hist(bins=bins)와 같이 최솟값~최댓값을 같은 폭으로 나누고,
+    # 경계에 걸친 값은 numpy.histogram처럼 실제 경계값과 다시 비교해 보정
+    def rating_histogram(self, bins=10):
+        with self.pool.reader() as conn:
+            low, high = conn.execute('SELECT MIN(rating), MAX(rating) FROM restaurants').fetchone()
+            if low is None:
+                return [], []
+            if low == high:
+                low, high = low - 0.5, high + 0.5
+            width = (high - low) / bins
+            params = {'low': low, 'norm': bins / (high - low), 'width': width, 'last': bins - 1}
+            counts = [0] * bins
+            for bucket, count in conn.execute('''
+            WITH binned AS (
+                SELECT rating, MIN(CAST((rating - :low) * :norm AS INTEGER), :last) AS bucket
+                FROM restaurants WHERE rating IS NOT NULL
+            )
+            SELECT
+                CASE
+                    WHEN rating < bucket * :width + :low THEN bucket - 1
+                    WHEN bucket < :last AND rating >= (bucket + 1) * :width + :low THEN bucket + 1
+                    ELSE bucket
+                END AS adjusted,
+                COUNT(*)
+            FROM binned
+            GROUP BY adjusted
+            ''', params):
+                counts[bucket] += count
+        edges = [width * i + low for i in range(bins)] + [high]
+        return counts, edges
+
+    # 가격대 구간별 가게 수 (price_min/price_max는 적재할 때 한 번만 해석해 둠)
+    def price_distribution(self):
+        cases = ' '.join(f'WHEN price < {limit} THEN {position}'
+                         for position, (_, limit) in enumerate(PRICE_BUCKETS) if limit is not None)
+        with self.pool.reader() as conn:
+            rows = conn.execute(f'''
+            SELECT CASE {cases} ELSE {len(PRICE_BUCKETS) - 1} END AS bucket, COUNT(*)
+            FROM (SELECT COALESCE(price_min, price_max) AS price FROM restaurants)
+            WHERE price IS NOT NULL
+            GROUP BY bucket
+            ''').fetchall()
+        counts = dict(rows)
+        return {label: counts.get(position, 0) for position, (label, _) in enumerate(PRICE_BUCKETS)}
 
     def visualize_data(self):
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        fig = _figure(figsize=(15, 6))
+        ax1, ax2 = fig.subplots(1, 2)
 
-        # 평점 분포
-        self.cursor.execute('SELECT rating FROM restaurants')
-        ratings = [row[0] for row in self.cursor.fetchall()]
-        ax1.hist(ratings, bins=10, edgecolor='black')
+        # 평점 분포 (구간별 개수만 받아서 그림)
+        counts, edges = self.rating_histogram()
+        if counts:
+            ax1.hist(edges[:-1], bins=edges, weights=counts, edgecolor='black')
         ax1.set_title('레스토랑 평점 분포')
         ax1.set_xlabel('평점')
         ax1.set_ylabel('레스토랑 수')
 
         # 가격대 분포
-        self.cursor.execute('SELECT price_range FROM restaurants')
-        prices = [row[0] for row in self.cursor.fetchall() if row[0]]
-        price_ranges = {'~¥1000': 0, '¥1000~¥2000': 0, '¥2000~¥3000': 0, '¥3000~': 0}
-        for price in prices:
-            amount = int(price.replace('¥', '').replace(',', '').split('~')[0])
-            if amount < 1000:
-                price_ranges['~¥1000'] += 1
-            elif amount < 2000:
-                price_ranges['¥1000~¥2000'] += 1
-            elif amount < 3000:
-                price_ranges['¥2000~¥3000'] += 1
-            else:
-                price_ranges['¥3000~'] += 1
-        
-        ax2.pie(price_ranges.values(), labels=price_ranges.keys(), autopct='%1.1f%%', startangle=90)
+        price_ranges = self.price_distribution()
+        if any(price_ranges.values()):
+            ax2.pie(price_ranges.values(), labels=price_ranges.keys(), autopct='%1.1f%%', startangle=90)
         ax2.set_title('레스토랑 가격대 분포')
 
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
 
+    # 차트를 PNG/SVG 바이트로 반환. 데이터 리비전이 그대로면 다시 그리지 않고 캐시를 사용
+    def render(self, fmt='png'):
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"지원하지 않는 이미지 형식입니다: {fmt}")
+        key = (os.path.abspath(self.db_name), fmt)
+        revision = self.get_revision()
+        with _render_cache_lock:
+            cached = _render_cache.get(key)
+        if cached and cached[0] == revision:
+            return cached[1]
+        buffer = io.BytesIO()
+        self.visualize_data().savefig(buffer, format=fmt)
+        image = buffer.getvalue()
+        with _render_cache_lock:
+            _render_cache[key] = (revision, image)
+        return image
+
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.pool = None
@@ -0,0 +1,83 @@
+# single_flight.py
+import threading
+
+# leader를 기다리는 최대 시간(초). 넘기면 기다리던 호출이 직접 실행 (멈춘 스트리밍 leader 등에 묶이지 않도록)
+WAIT_TIMEOUT = 120.0
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+
+class SingleFlight:
+    # 같은 키로 동시에 들어온 호출을 하나로 합침: 먼저 온 호출(leader)만 실제로 실행하고
+    # 나머지는 그 결과(또는 예외)를 기다려 함께 사용. 끝난 호출은 바로 지워지므로 결과를 캐시하지는 않음
+    def __init__(self, timeout=WAIT_TIMEOUT):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.timeout = timeout
+        self.executed = 0
+        self.coalesced = 0
+        self.timed_out = 0
+
+    # (호출, leader 여부). leader는 반드시 complete로 끝내야 함
+    def join(self, key):
+        with self.lock:
+            call = self.calls.get(key)
+            if call:
+                self.coalesced += 1
+                return call, False
+            call = self.calls[key] = _Call()
+            self.executed += 1
+            return call, True
+
+    # leader가 끝나면 True. 시간 안에 끝나지 않으면 False이고, 호출한 쪽이 직접 실행하므로 합친 호출이 아니라 실행으로 셈
+    def wait(self, call):
+        if call.done.wait(self.timeout):
+            return True
+        with self.lock:
+            self.coalesced -= 1
+            self.executed += 1
+            self.timed_out += 1
+        return False
+
+    # abandoned면 leader가 결과 없이 중단된 것이므로 기다리던 호출이 직접 다시 시도
+    def complete(self, key, call, result=None, error=None, abandoned=False):
+        with self.lock:
+            if self.calls.get(key) is call:
+                del self.calls[key]
+        call.result = result
+        call.error = error
+        call.abandoned = abandoned
+        call.done.set()
+
+    def do(self, key, fn):
+        while True:
+            call, leader = self.join(key)
+            if leader:
+                break
+            if not self.wait(call):
+                return fn()
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            result = fn()
+        except Exception as e:
+            self.complete(key, call, error=e)
+            raise
+        except BaseException:
+            # Streamlit 재실행 등으로 중단된 경우
+            self.complete(key, call, abandoned=True)
+            raise
+        self.complete(key, call, result=result)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced, 'timed_out': self.timed_out,
+                    'in_flight': len(self.calls)}
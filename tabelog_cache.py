@@ -0,0 +1,80 @@
+# tabelog_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+class ResponseCache:
+    # mode='revalidate': ETag/Last-Modified로 조건부 요청 후 304면 캐시 본문 사용
+    # mode='replay': 네트워크 없이 캐시에 있는 페이지만 사용
+    def __init__(self, cache_dir, mode='revalidate'):
+        if mode not in ('revalidate', 'replay'):
+            raise ValueError(f"지원하지 않는 캐시 모드입니다: {mode}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.index_dir = os.path.join(cache_dir, 'index')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    @property
+    def replay(self):
+        return self.mode == 'replay'
+
+    def _index_path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.index_dir, key + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, url):
+        try:
+            with open(self._index_path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not os.path.exists(self._object_path(entry['body'])):
+            return None
+        return entry
+
+    def read_body(self, entry):
+        with open(self._object_path(entry['body']), 'rb') as f:
+            return f.read()
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, body, headers):
+        # 본문은 내용 해시로 저장하므로 같은 페이지는 한 번만 디스크에 기록됨
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, body)
+        entry = {
+            'url': url,
+            'body': digest,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time()
+        }
+        self._write_atomic(self._index_path(url), json.dumps(entry).encode('utf-8'))
+        return entry
+
+    def touch(self, url, entry):
+        entry = dict(entry, fetched_at=time.time())
+        self._write_atomic(self._index_path(url), json.dumps(entry).encode('utf-8'))
+        return entry
@@ -0,0 +1,97 @@
+# tabelog_detail_crawler.py
+import asyncio
+import aiohttp
+from bs4 import BeautifulSoup
+from tabelog_scraper import PageGone, TabelogScraper
+
+# 상세 페이지 가게 정보 표의 항목명 → DB 컬럼
+DETAIL_FIELDS = {
+    '住所': 'address',
+    '電話番号': 'phone',
+    '予約・お問い合わせ': 'phone',
+    '営業時間': 'hours',
+    '予算': 'price_range',
+    'ジャンル': 'menu'
+}
+
+def _text(node):
+    return node.get_text(' ', strip=True) if node else None
+
+def parse_restaurant_detail(content, backend='html.parser'):
+    soup = BeautifulSoup(content, backend)
+    details = {}
+
+    rating = _text(soup.select_one('.rdheader-rating__score-val-dtl'))
+    if rating:
+        try:
+            details['rating'] = float(rating)
+        except ValueError:
+            pass  # 평점이 없는 가게는 '-'로 표시됨
+
+    reviews = _text(soup.select_one('.rdheader-rating__review-target .num'))
+    if reviews and reviews.replace(',', '').isdigit():
+        details['reviews'] = int(reviews.replace(',', ''))
+
+    for row in soup.select('.rstinfo-table__table tr'):
+        label = ''.join(_text(row.th).split()) if row.th else ''
+        field = DETAIL_FIELDS.get(label)
+        if not field or field in details or not row.td:
+            continue
+        if field == 'address':
+            value = _text(row.td.select_one('.rstinfo-table__address'))
+        elif field == 'phone':
+            value = _text(row.td.select_one('.rstinfo-table__tel-num')) or _text(row.td)
+        elif field == 'price_range':
+            value = _text(row.td.select_one('em'))
+        else:
+            value = _text(row.td)
+        if value:
+            details[field] = value
+
+    station = _text(soup.select_one('.rdheader-subinfo__item--station .linktree__parent-target-text'))
+    if station:
+        details['location'] = station
+    return details
+
+class TabelogDetailCrawler:
+    # 목록에서 수집한 url을 따라가 상세 정보를 채움.
+    # 상세 페이지를 받은 지 staleness_days가 지났거나 아직 받지 않은 행만 가져옴
+    def __init__(self, db, scraper=None, staleness_days=7, parser='html.parser'):
+        self.db = db
+        self.scraper = scraper or TabelogScraper()
+        self.staleness_days = staleness_days
+        self.parser = parser
+
+    def refresh(self):
+        rows = self.db.get_stale_restaurants(self.staleness_days)
+        if not rows:
+            return 0
+        return asyncio.run(self._crawl(rows))
+
+    async def _crawl(self, rows):
+        scraper = self.scraper
+        semaphore = asyncio.Semaphore(scraper.concurrency)
+        # keep-alive 연결 풀을 모든 상세 페이지 요청이 공유
+        connector = aiohttp.TCPConnector(limit=scraper.concurrency)
+        updated = 0
+        async with aiohttp.ClientSession(headers=scraper.headers, connector=connector, timeout=scraper.timeout) as session:
+            tasks = [self._fetch_details(session, semaphore, row_id, url) for row_id, url in rows]
+            for task in asyncio.as_completed(tasks):
+                row_id, details = await task
+                # 받지 못한 페이지(None)는 다음 실행에서 다시 시도하고, 받았으면 빈 결과라도 기록
+                if details is not None:
+                    self.db.update_details(row_id, details)
+                    updated += bool(details)
+        return updated
+
+    async def _fetch_details(self, session, semaphore, row_id, url):
+        async with semaphore:
+            try:
+                content = await self.scraper._fetch_async(session, url)
+            except PageGone:
+                # 없어진 가게는 빈 결과로 기록해 details_fetched_at이 찍히게 함 (매번 다시 요청하지 않도록).
+                # 일시적인 실패(None)만 다음 실행에서 다시 시도
+                return row_id, {}
+        if content is None:
+            return row_id, None
+        return row_id, parse_restaurant_detail(content, self.parser)
@@ -1,44 +1,266 @@
 # tabelog_scraper.py
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import asyncio
+import aiohttp
 import time
 import random
 import json
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+PARSER_BACKENDS = ('html.parser', 'lxml', 'selectolax')
+LIST_ITEM_CLASS = re.compile(r'(^|\s)list-rst__item(\s|$)')
+
+logger = logging.getLogger(__name__)
+
+# 다시 요청해도 결과가 바뀌지 않는 응답 (폐점 등으로 없어진 페이지). 일시적인 실패(429/5xx, 연결 오류)와 구분
+GONE_STATUSES = frozenset((404, 410))
+
+class PageGone(Exception):
+    def __init__(self, url, status):
+        super().__init__(f"페이지가 없습니다 (HTTP {status}): {url}")
+        self.url = url
+        self.status = status
+
+def _parse_soup_items(soup, base_url):
+    restaurants = []
+    for item in soup.select('.list-rst__item'):
+        name = item.select_one('.list-rst__rst-name-target').text.strip()
+        rating = item.select_one('.c-rating__val').text.strip()
+        url = item.select_one('.list-rst__rst-name-target')['href']
+        restaurants.append({
+            'name': name,
+            'rating': rating,
+            'url': base_url + url
+        })
+    return restaurants
+
+def _parse_selectolax_items(content, base_url):
+    from selectolax.lexbor import LexborHTMLParser
+
+    restaurants = []
+    for item in LexborHTMLParser(content).css('.list-rst__item'):
+        name_node = item.css_first('.list-rst__rst-name-target')
+        restaurants.append({
+            'name': name_node.text().strip(),
+            'rating': item.css_first('.c-rating__val').text().strip(),
+            'url': base_url + name_node.attributes['href']
+        })
+    return restaurants
+
+# 프로세스 풀에서 실행할 수 있도록 모듈 수준 함수로 둠
+def parse_restaurant_list(content, base_url, backend='html.parser'):
+    if backend == 'selectolax':
+        return _parse_selectolax_items(content, base_url)
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"지원하지 않는 파서입니다: {backend}")
+    # 목록 항목만 트리로 만들어 전체 페이지 파싱 비용을 줄임
+    soup = BeautifulSoup(content, backend, parse_only=SoupStrainer(class_=LIST_ITEM_CLASS))
+    return _parse_soup_items(soup, base_url)
+
+class TokenBucket:
+    # rate: 초당 허용 요청 수, capacity: 한 번에 몰아서 보낼 수 있는 최대 요청 수
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.loop = None
+        self.lock = None
+
+    # asyncio.Lock은 처음 기다린 이벤트 루프에 묶이므로 asyncio.run마다 새로 만듦 (토큰 상태는 유지)
+    def _lock(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.lock = asyncio.Lock()
+        return self.lock
+
+    async def acquire(self):
+        async with self._lock():
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class HostRateLimiter:
+    # 호스트별로 토큰 버킷을 하나씩 두고 모든 작업이 공유
+    def __init__(self, rate=1.0, capacity=2):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+
+    async def acquire(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.capacity)
+        await self.buckets[host].acquire()
 
 class TabelogScraper:
-    def __init__(self):
+    # timeout: 요청 하나의 최대 시간(초). 넘기면 그 페이지만 실패로 건너뜀
+    def __init__(self, concurrency=8, rate=1.0, burst=2, cache=None, parser='html.parser', parse_workers=0, timeout=30):
+        if parser not in PARSER_BACKENDS:
+            raise ValueError(f"지원하지 않는 파서입니다: {parser}")
         self.headers = {
             'User-Agent': 'CustomBot/1.0 (https://example.com/bot; bot@example.com)'
         }
         self.base_url = 'https://tabelog.com'
+        self.concurrency = concurrency
+        self.rate_limiter = HostRateLimiter(rate, burst)
+        self.cache = cache
+        self.parser = parser
+        self.parse_workers = parse_workers
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    def _build_url(self, area, cuisine, page):
+        return f"{self.base_url}/tokyo/{area}/rstLst/{page}/?vs=1&sa={area}&sk={cuisine}"
 
-    def scrape_area(self, area, cuisine, num_pages=2):
+    # writer(JsonlWriter)를 넘기면 페이지마다 파일에 기록하고 메모리에는 쌓지 않으며,
+    # 이미 체크포인트에 있는 페이지는 건너뜀
+    def scrape_area(self, area, cuisine, num_pages=2, writer=None):
         all_restaurants = []
         for page in range(1, num_pages + 1):
-            url = f"{self.base_url}/tokyo/{area}/rstLst/{page}/?vs=1&sa={area}&sk={cuisine}"
-            response = requests.get(url, headers=self.headers)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            restaurants = self._parse_restaurant_list(soup)
-            all_restaurants.extend(restaurants)
-            
-            time.sleep(random.uniform(1, 3))  # 요청 간 딜레이
-        
+            if writer and writer.is_done(area, cuisine, page):
+                continue
+            url = self._build_url(area, cuisine, page)
+            content = self._fetch(url)
+            # 받지 못한 페이지는 기록하지 않아 다음 실행에서 다시 시도
+            if content is not None:
+                restaurants = parse_restaurant_list(content, self.base_url, self.parser)
+                if writer:
+                    writer.write_page(area, cuisine, page, restaurants)
+                else:
+                    all_restaurants.extend(restaurants)
+
+            if not (self.cache and self.cache.replay):
+                time.sleep(random.uniform(1, 3))  # 요청 간 딜레이
+
         return all_restaurants
 
-    def _parse_restaurant_list(self, soup):
-        restaurants = []
-        for item in soup.select('.list-rst__item'):
-            name = item.select_one('.list-rst__rst-name-target').text.strip()
-            rating = item.select_one('.c-rating__val').text.strip()
-            url = item.select_one('.list-rst__rst-name-target')['href']
-            restaurants.append({
-                'name': name,
-                'rating': rating,
-                'url': self.base_url + url
-            })
+    def _fetch(self, url):
+        entry = self.cache.lookup(url) if self.cache else None
+        if self.cache and self.cache.replay:
+            # 재생 모드에서는 캐시에 없는 페이지를 건너뜀
+            return self.cache.read_body(entry) if entry else None
+
+        headers = dict(self.headers)
+        if entry:
+            headers.update(self.cache.conditional_headers(entry))
+        response = requests.get(url, headers=headers)
+        if entry and response.status_code == 304:
+            self.cache.touch(url, entry)
+            return self.cache.read_body(entry)
+        if response.status_code != 200:
+            # 429/503 같은 응답을 빈 페이지로 파싱해 체크포인트에 남기지 않도록 건너뜀
+            logger.warning("페이지를 가져오지 못했습니다 (HTTP %d): %s", response.status_code, url)
+            return None
+        if self.cache:
+            self.cache.store(url, response.content, response.headers)
+        return response.content
+
+    async def _fetch_async(self, session, url):
+        entry = await asyncio.to_thread(self.cache.lookup, url) if self.cache else None
+        if self.cache and self.cache.replay:
+            return await asyncio.to_thread(self.cache.read_body, entry) if entry else None
+
+        headers = self.cache.conditional_headers(entry) if entry else {}
+        await self.rate_limiter.acquire(url)
+        try:
+            async with session.get(url, headers=headers) as response:
+                content = await response.read()
+                status = response.status
+                response_headers = response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("페이지를 가져오지 못했습니다 (%s): %s", e.__class__.__name__, url)
+            return None
+        if entry and status == 304:
+            await asyncio.to_thread(self.cache.touch, url, entry)
+            return await asyncio.to_thread(self.cache.read_body, entry)
+        if status in GONE_STATUSES:
+            raise PageGone(url, status)
+        if status != 200:
+            logger.warning("페이지를 가져오지 못했습니다 (HTTP %d): %s", status, url)
+            return None
+        if self.cache:
+            await asyncio.to_thread(self.cache.store, url, content, response_headers)
+        return content
+
+    # 비동기 크롤링 모드: (지역, 메뉴, 페이지) 작업을 동시에 실행하고
+    # 요청 간격은 고정 sleep 대신 호스트별 토큰 버킷으로 조절
+    def scrape_all(self, areas, cuisines, num_pages=2, writer=None):
+        jobs = [(area, cuisine, page)
+                for area in areas
+                for cuisine in cuisines
+                for page in range(1, num_pages + 1)]
+        pages = asyncio.run(self.crawl(jobs, writer))
+
+        results = {(area, cuisine): [] for area in areas for cuisine in cuisines}
+        for (area, cuisine, page), restaurants in zip(jobs, pages):
+            results[(area, cuisine)].extend(restaurants)
+        return results
+
+    async def scrape_area_async(self, area, cuisine, num_pages=2, writer=None):
+        jobs = [(area, cuisine, page) for page in range(1, num_pages + 1)]
+        pages = await self.crawl(jobs, writer)
+        return [restaurant for restaurants in pages for restaurant in restaurants]
+
+    async def crawl(self, jobs, writer=None):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        executor = ProcessPoolExecutor(self.parse_workers) if self.parse_workers else None
+        try:
+            async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=self.timeout) as session:
+                pages = await asyncio.gather(
+                    *(self._scrape_page(session, semaphore, executor, job, writer) for job in jobs),
+                    return_exceptions=True
+                )
+        finally:
+            if executor:
+                executor.shutdown()
+        # 실패한 작업 하나 때문에 이미 받은 페이지를 버리지 않도록 작업별로 처리
+        results = []
+        for (area, cuisine, page), result in zip(jobs, pages):
+            if isinstance(result, Exception):
+                logger.warning("페이지 처리 실패 (%s %s %d페이지): %r", area, cuisine, page, result)
+                result = []
+            results.append(result)
+        return results
+
+    async def _scrape_page(self, session, semaphore, executor, job, writer):
+        area, cuisine, page = job
+        if writer and writer.is_done(area, cuisine, page):
+            return []
+        url = self._build_url(area, cuisine, page)
+        async with semaphore:
+            try:
+                content = await self._fetch_async(session, url)
+            except PageGone as e:
+                logger.warning("%s", e)
+                return []
+        if content is None:
+            return []
+        if executor:
+            # 파싱은 CPU 작업이므로 워커 프로세스로 넘겨 이벤트 루프를 막지 않음
+            loop = asyncio.get_running_loop()
+            restaurants = await loop.run_in_executor(executor, parse_restaurant_list, content, self.base_url, self.parser)
+        else:
+            restaurants = parse_restaurant_list(content, self.base_url, self.parser)
+        if writer:
+            # fsync가 끝날 때까지 이벤트 루프(다른 페이지 요청)를 막지 않도록 스레드에서 기록
+            await asyncio.to_thread(writer.write_page, area, cuisine, page, restaurants)
+            return []
         return restaurants
 
+    def _parse_restaurant_list(self, soup):
+        return _parse_soup_items(soup, self.base_url)
+
     def save_to_json(self, data, filename):
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+            json.dump(data, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,54 @@
+# test_restaurant_data_integrator.py
+import random
+from difflib import SequenceMatcher
+import pytest
+from restaurant_data_integrator import RestaurantDataIntegrator
+
+# 색인 도입 전 방식: 앞서 남은 가게 중 비율이 0.8을 넘는 이름이 하나도 없으면 남김
+def _brute_force(restaurants):
+    unique = []
+    for restaurant in restaurants:
+        if not any(SequenceMatcher(None, restaurant['name'], other['name']).ratio() > 0.8 for other in unique):
+            unique.append(restaurant)
+    return unique
+
+# 작은 알파벳으로 비슷한 이름이 많이 생기게 하고, 빈 이름·한 글자·바이그램이 반복되는 이름도 섞음
+def _corpus(alphabet, seed, count=200, max_length=40):
+    rng = random.Random(seed)
+    names = ['', 'a', 'b', 'aa', 'abababab', 'ababababa', 'aaaaaaaaaa', 'aaaaaaaaab']
+    while len(names) < count:
+        base = rng.choice(names) if rng.random() < 0.5 else ''
+        if base:
+            # 기존 이름을 조금 바꿔 경계 근처의 쌍을 만듦
+            chars = list(base)
+            for _ in range(rng.randint(1, 3)):
+                position = rng.randint(0, len(chars))
+                if chars and rng.random() < 0.5:
+                    del chars[min(position, len(chars) - 1)]
+                else:
+                    chars.insert(position, rng.choice(alphabet))
+            names.append(''.join(chars)[:max_length])
+        else:
+            names.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))))
+    rng.shuffle(names)
+    return [{'id': position, 'name': name} for position, name in enumerate(names)]
+
+def _deduplicated(restaurants, workers=0):
+    integrator = RestaurantDataIntegrator()
+    integrator.restaurants = [dict(restaurant) for restaurant in restaurants]
+    integrator.deduplicate(workers)
+    return [restaurant['id'] for restaurant in integrator.restaurants]
+
+@pytest.mark.parametrize('alphabet', ['ab', 'abc', 'abcd', 'abcdefg'])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_deduplicate_matches_brute_force(alphabet, seed):
+    restaurants = _corpus(alphabet, seed)
+    expected = [restaurant['id'] for restaurant in _brute_force(restaurants)]
+    assert _deduplicated(restaurants) == expected
+
+# 프로세스 풀로 점수를 매겨도 직렬 실행과 같은 가게가 같은 순서로 남아야 함
+@pytest.mark.parametrize('alphabet', ['ab', 'abcd'])
+def test_parallel_deduplicate_matches_serial(alphabet, monkeypatch):
+    monkeypatch.setattr('restaurant_data_integrator.PAIR_CHUNK_SIZE', 500)
+    restaurants = _corpus(alphabet, 0)
+    assert _deduplicated(restaurants, workers=2) == _deduplicated(restaurants)
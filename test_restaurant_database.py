@@ -0,0 +1,67 @@
+# test_restaurant_database.py
+import pytest
+from restaurant_database import RestaurantDatabase
+from restaurant_db_pool import close_pool
+
+@pytest.fixture
+def db(tmp_path):
+    db_name = str(tmp_path / 'restaurants.db')
+    database = RestaurantDatabase(db_name)
+    yield database
+    close_pool(db_name)
+
+def _restaurants(count):
+    return [
+        {'name': f'가게{i}', 'rating': str(3 + (i % 20) / 10), 'reviews': str(i),
+         'url': f'https://tabelog.com/tokyo/{i}/', 'location': ('shibuya', 'ginza')[i % 2], 'menu': 'sushi'}
+        for i in range(count)
+    ]
+
+# 지역 + 메뉴 + 키셋(after) 조회는 복합 인덱스만으로 찾고 정렬용 임시 B-트리를 만들지 않아야 함
+@pytest.mark.parametrize('order_by, after', [('rating', (4.0, 10)), ('reviews', (100, 10))])
+def test_location_menu_after_uses_index(db, order_by, after):
+    db.bulk_load(_restaurants(200))
+    plan = db.explain_get_restaurants('shibuya', 'sushi', order_by=order_by, after=after)
+    assert any(step.startswith(f'SEARCH restaurants USING INDEX idx_restaurants_location_menu_{order_by}')
+               for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+def test_keyset_pages_match_full_order(db):
+    db.bulk_load(_restaurants(200))
+    expected = sorted(db.get_restaurants('shibuya', 'sushi', limit=1000),
+                      key=lambda row: (row['rating'], row['id']), reverse=True)
+    pages = []
+    after = None
+    while True:
+        page = db.get_restaurants('shibuya', 'sushi', limit=7, after=after)
+        if not page:
+            break
+        pages.extend(page)
+        after = (page[-1]['rating'], page[-1]['id'])
+    assert [row['id'] for row in pages] == [row['id'] for row in expected]
+
+def _new_restaurants(start, count):
+    return [dict(restaurant, url=f'https://tabelog.com/tokyo/new/{start + i}/')
+            for i, restaurant in enumerate(_restaurants(count))]
+
+def test_summaries_match_after_loads(db):
+    db.bulk_load(_restaurants(200))
+    db.bulk_load(_restaurants(20), defer_summaries=False)
+    db.bulk_load(_restaurants(300), defer_summaries=True)
+    assert db.check_summaries() == []
+    assert db.get_total_restaurants() == 300
+
+# 기본값(None)은 기존 행 수에 비해 적은 적재면 트리거를 그대로 쓰고(행마다 리비전 +1),
+# 많으면 트리거를 내리고 마지막에 한 번 재집계함(리비전 +1)
+def test_bulk_load_defers_summaries_only_for_large_loads(db):
+    db.bulk_load(_restaurants(200))
+    revision = db.get_revision()
+    db.bulk_load(_new_restaurants(0, 10))
+    assert db.get_revision() == revision + 10
+    assert db.check_summaries() == []
+
+    revision = db.get_revision()
+    db.bulk_load(_new_restaurants(10, 100))
+    assert db.get_revision() == revision + 1
+    assert db.check_summaries() == []
+    assert db.get_total_restaurants() == 310
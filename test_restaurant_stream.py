@@ -0,0 +1,31 @@
+# test_restaurant_stream.py
+import io
+import json
+import pytest
+from restaurant_stream import _iter_json_array, iter_restaurants
+
+RESTAURANTS = [
+    {'name': '鮨 さいとう', 'rating': '4.5', 'url': 'https://tabelog.com/tokyo/1/', 'note': '}], [{'},
+    {'name': 'A', 'rating': 3, 'nested': [1, [2, ']']], 'price': -12345.5},
+    {'name': '', 'rating': None}
+]
+
+# 조각 경계가 문자열·숫자·중첩 배열 한가운데에 걸려도 json.load와 같은 결과
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 4096])
+@pytest.mark.parametrize('indent', [None, 4])
+def test_json_array_streams_like_json_load(chunk_size, indent):
+    text = json.dumps(RESTAURANTS, ensure_ascii=False, indent=indent)
+    assert list(_iter_json_array(io.StringIO(text), chunk_size)) == RESTAURANTS
+
+@pytest.mark.parametrize('text', ['', '[', '[{"name": "A"}', '{"name": "A"}', '[{"name": }]'])
+def test_json_array_rejects_malformed_input(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(_iter_json_array(io.StringIO(text), 3))
+
+def test_iter_restaurants_reads_json_and_jsonl(tmp_path):
+    json_path = tmp_path / 'restaurants.json'
+    json_path.write_text(json.dumps(RESTAURANTS, ensure_ascii=False, indent=4), encoding='utf-8')
+    jsonl_path = tmp_path / 'restaurants.jsonl'
+    jsonl_path.write_text(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in RESTAURANTS), encoding='utf-8')
+    assert list(iter_restaurants(str(json_path))) == RESTAURANTS
+    assert list(iter_restaurants(str(jsonl_path))) == RESTAURANTS